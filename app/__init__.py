@@ -6,7 +6,10 @@ from flask_migrate import Migrate
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from app.database import db, init_db
-from app.utils.stocks_api import format_number
+from app.utils.formatting import format_currency, format_number
+from app.utils.currency_catalogue import CurrencyCatalogue
+from app.utils.estimates import EstimateEngine
+from app.utils.nowpayments import NOWPaymentsService
 
 load_dotenv()
 
@@ -55,6 +58,26 @@ def create_app():
                                                                 "True").lower() == "true"
     app.config["NOWPAYMENTS_FIXED_RATE"] = os.environ.get("NOWPAYMENTS_FIXED_RATE", "True").lower() == "true"
 
+    # HTTP client tuning: pool size (>= threads per worker), timeouts, GET retries, circuit breaker
+    app.config["NOWPAYMENTS_POOL_SIZE"] = int(os.environ.get("NOWPAYMENTS_POOL_SIZE", 10))
+    app.config["NOWPAYMENTS_CONNECT_TIMEOUT"] = float(os.environ.get("NOWPAYMENTS_CONNECT_TIMEOUT", 3.05))
+    app.config["NOWPAYMENTS_READ_TIMEOUT"] = float(os.environ.get("NOWPAYMENTS_READ_TIMEOUT", 10))
+    app.config["NOWPAYMENTS_RETRIES"] = int(os.environ.get("NOWPAYMENTS_RETRIES", 2))
+    app.config["NOWPAYMENTS_BREAKER_FAILURES"] = int(os.environ.get("NOWPAYMENTS_BREAKER_FAILURES", 5))
+    app.config["NOWPAYMENTS_BREAKER_RESET"] = float(os.environ.get("NOWPAYMENTS_BREAKER_RESET", 30))
+
+    # Currency lists / minimum amounts are served from memory and refreshed after this many seconds
+    app.config["NOWPAYMENTS_CATALOGUE_TTL"] = int(os.environ.get("NOWPAYMENTS_CATALOGUE_TTL", 6 * 60 * 60))
+
+    # Estimates are computed from a per-pair rate refetched after this many seconds,
+    # and a user triggers at most one refetch per debounce window
+    app.config["NOWPAYMENTS_ESTIMATE_TTL"] = float(os.environ.get("NOWPAYMENTS_ESTIMATE_TTL", 10))
+    app.config["NOWPAYMENTS_ESTIMATE_DEBOUNCE"] = float(os.environ.get("NOWPAYMENTS_ESTIMATE_DEBOUNCE", 2))
+
+    # Live /api/stream (Server-Sent Events). Each open stream holds a worker, so only
+    # enable it under gevent (gunicorn -k gevent); pages poll instead when it is off
+    app.config["SSE_ENABLED"] = os.environ.get("SSE_ENABLED", "False").lower() == "true"
+
     # Initialize database
     db.init_app(app)
     migrate = Migrate(app, db)
@@ -68,8 +91,22 @@ def create_app():
 
     app.limiter = limiter
 
+    # One NOWPayments client per process, so requests share its connection pool
+    # and circuit breaker (see app.routes.payments.get_nowpayments_service)
+    app.extensions["nowpayments"] = NOWPaymentsService.from_config(app.config)
+    app.extensions["currency_catalogue"] = CurrencyCatalogue(
+        app.extensions["nowpayments"],
+        ttl=app.config["NOWPAYMENTS_CATALOGUE_TTL"]
+    )
+    app.extensions["estimate_engine"] = EstimateEngine(
+        app.extensions["nowpayments"],
+        rate_ttl=app.config["NOWPAYMENTS_ESTIMATE_TTL"],
+        user_debounce=app.config["NOWPAYMENTS_ESTIMATE_DEBOUNCE"]
+    )
+
     # Register it as a Jinja filter
     app.jinja_env.filters["compact"] = format_number
+    app.jinja_env.filters["currency"] = format_currency
 
     @login_manager.user_loader
     def load_user(user_id):
@@ -89,6 +126,8 @@ def create_app():
     from app.routes.dashboard import dashboard_bp
     from app.routes.notifications import notifications_bp
     from app.routes.payments import payment_bp
+    from app.routes.stocks import stocks_bp
+    from app.routes.events import events_bp
 
 
     app.register_blueprint(auth_bp)
@@ -96,14 +135,44 @@ def create_app():
     app.register_blueprint(dashboard_bp)
     app.register_blueprint(notifications_bp)
     app.register_blueprint(payment_bp)
+    app.register_blueprint(stocks_bp)
+    app.register_blueprint(events_bp)
 
     # CREATE DATABASE TABLES
     with app.app_context():
         init_db()
 
-    @app.template_filter("currency")
-    def currency_filter(value):
-        return "${:,.2f}".format(float(value))
+    # Push new notifications to open /api/stream connections
+    from app.utils.events import init_event_hooks, relay_quotes
+    init_event_hooks()
+
+    # Stored IPN callbacks are applied inline after the row is saved. Long-running
+    # servers can set IPN_WORKERS to ack immediately and apply them on a worker
+    # pool (started by the first callback, in the process serving it); run
+    # `flask process-ipn` on a schedule to retry failures either way.
+    from app.routes.payments import apply_ipn_event
+    from app.utils.ipn_queue import ipn_queue, process_ipn_command
+    ipn_queue.workers = int(os.environ.get("IPN_WORKERS", 0))
+    ipn_queue.init_app(app, handler=apply_ipn_event)
+    app.cli.add_command(process_ipn_command)
+
+    # Keep the stocks cache warm in the background so requests never fetch inline.
+    # Serverless deployments should run `flask refresh-stocks` on a schedule instead.
+    from app.utils.stock_refresher import refresher, refresh_stocks_command
+    app.cli.add_command(refresh_stocks_command)
+    from app.utils.symbol_universe import load_symbols_command
+    app.cli.add_command(load_symbols_command)
+    if os.environ.get("STOCKS_BACKGROUND_REFRESH", "False").lower() == "true":
+        refresher.start()
+
+    # Stream live trades instead of polling /quote (needs a long-running server)
+    if os.environ.get("FINNHUB_WEBSOCKET", "False").lower() == "true":
+        from app.utils.stocks_api import api
+        from app.utils.quote_feed import quote_feed
+        quote_feed.subscribe(api.get_major_stocks_list())
+        quote_feed.start()
+        api.quote_feed = quote_feed
+        relay_quotes(quote_feed)
 
     # ERROR HANDLERS
     @app.errorhandler(404)
@@ -1,6 +1,6 @@
 from app.models.user import User
 from app.models.notification import Notification, NotificationPreference
-from app.models.payment import PaymentCallback, CryptoTransaction, CryptoPayment
+from app.models.payment import PaymentCallback, CryptoTransaction, CryptoPayment, IpnEvent
 from app.models.transaction import Transaction
 from app.models.contact_us import ContactMessage
 from app.models.wallet import Wallet
@@ -13,6 +13,7 @@ __all__ = [
     "CryptoPayment",
     "PaymentCallback",
     "CryptoTransaction",
+    "IpnEvent",
     "Transaction",
     "ContactMessage",
     "Wallet"
@@ -119,6 +119,44 @@ class PaymentCallback(db.Model):
         return f'<PaymentCallback {self.payment_id} - {self.payment_status}>'
 
 
+class IpnEvent(db.Model):
+    """
+    Outbox of verified IPN callbacks, stored before NOWPayments gets its 200
+    and applied afterwards by the IPN worker pool (see app/utils/ipn_queue.py)
+    """
+    __tablename__ = "ipn_events"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    # What the callback is about
+    payment_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True, index=True)
+    invoice_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    payment_status: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+
+    # Idempotency: "<payment>:<status>"; applied_key is only set on the one event
+    # per key whose effects were applied, so the unique index rejects repeats
+    ipn_key: Mapped[str] = mapped_column(String(160), nullable=False, index=True)
+    applied_key: Mapped[Optional[str]] = mapped_column(String(160), nullable=True, unique=True)
+
+    # Raw callback; content_hash (sha256 of the canonical payload) drops byte-identical retries
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, unique=True, index=True)
+    signature: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+
+    # Processing state: pending, processing, done, duplicate, stale, unmatched, failed
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="pending", index=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    # Timestamps
+    received_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    claimed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    processed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    def __repr__(self) -> str:
+        return f'<IpnEvent {self.ipn_key} - {self.status}>'
+
+
 class CryptoTransaction(db.Model):
     """
     Model to track individual blockchain transactions
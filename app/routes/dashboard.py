@@ -10,17 +10,15 @@ dashboard_bp = Blueprint("dashboard", __name__)
 @dashboard_bp.route("/dashboard")
 @login_required
 def dashboard():
-    # all_stocks = api.get_all_major_stocks(
-    #     limit=50,
-    #     use_cache=True,
-    #     cache_max_age_hours=24
-    # )
-    # categories = api.categorize_stocks(all_stocks)
+    # Never fetches inline: the background refresher keeps the cache warm
+    # all_stocks, stocks_stale = api.get_cached_major_stocks(limit=50, max_age_hours=24)
+    # categories = api.get_cached_categories(limit=50)
     # gainers_and_losers = categories["gainers"][:3] + categories["losers"][:2]
     transactions = TransactionService.get_user_transactions(current_user.id)
     wallet = Wallet.get_or_create(current_user.id)
     return render_template("dashboard/dashboard.html", transactions=transactions,
                            # all_stocks=all_stocks,
+                           # stocks_stale=stocks_stale,
                            # trending_stocks=categories["trending"],
                            # gainers_losers_stocks=gainers_and_losers,
                            current_user=current_user,
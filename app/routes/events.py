@@ -0,0 +1,74 @@
+import queue
+import time
+from flask import Blueprint, Response, current_app, request, stream_with_context
+from flask_login import login_required, current_user
+from app.database import db
+from app.utils import notifications as notif_utils
+from app.utils.events import broker, format_sse
+
+events_bp = Blueprint("events", __name__)
+
+KEEPALIVE_SECONDS = 15
+MAX_STREAM_SECONDS = 60 * 60  # EventSource reconnects by itself
+
+
+# ============================================================================
+# API ROUTES
+# ============================================================================
+
+@events_bp.route("/api/stream", methods=["GET"])
+@login_required
+def stream():
+    """
+    One long-lived Server-Sent Events connection per page, replacing polling
+
+    Events:
+        unread_count    {"count": n} on connect and after each new notification
+        notification    a newly created notification
+        payment_status  the payment (as /dashboard/payments/status returns it)
+        quote           last trade for a symbol listed in ?symbols=AAPL,MSFT
+
+    Each open stream holds a worker, so it is off unless SSE_ENABLED is set
+    (run under gevent, gunicorn -k gevent, when it is). While off the route
+    answers 204, which tells EventSource to stop reconnecting.
+    """
+    if not current_app.config.get("SSE_ENABLED"):
+        return Response(status=204)
+
+    user_id = current_user.id
+    symbols = {s.strip().upper() for s in request.args.get("symbols", "").split(",") if s.strip()}
+    events = broker.subscribe(user_id)
+
+    def generate():
+        try:
+            yield "retry: 5000\n\n"
+            yield format_sse("unread_count", {"count": notif_utils.get_unread_count(user_id)})
+            # Don't hold a pooled DB connection open for the life of the stream
+            db.session.remove()
+
+            deadline = time.monotonic() + MAX_STREAM_SECONDS
+            while time.monotonic() < deadline:
+                try:
+                    name, data = events.get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                if name == "quote" and data.get("symbol") not in symbols:
+                    continue
+                yield format_sse(name, data)
+
+                if name == "notification":
+                    yield format_sse("unread_count", {"count": notif_utils.get_unread_count(user_id)})
+                    db.session.remove()
+        finally:
+            broker.unsubscribe(user_id, events)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # stop nginx from buffering the stream
+        }
+    )
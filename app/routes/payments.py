@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify, render_template, url_for, flash, current_app
 from flask_login import login_required, current_user
 from datetime import datetime, timezone
+import math
 import uuid
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
 from app.models.notification import Notification
 from app.models.user import User
 from app.utils.nowpayments import NOWPaymentsService, PaymentStatus
@@ -9,24 +12,38 @@ from app.models.payment import (
     db,
     CryptoPayment,
     PaymentCallback,
+    IpnEvent,
     payment_to_dict,
     is_payment_completed,
     is_payment_pending,
     is_payment_failed
 )
+from app.utils.currency_catalogue import CurrencyCatalogue
+from app.utils.estimates import EstimateEngine
 from app.utils.transactions import TransactionService
+from app.utils.events import broker
+from app.utils.ipn_queue import UNAPPLIED_STATUSES, ipn_key, ipn_payload_hash, ipn_queue
 
 # Create blueprint
 payment_bp = Blueprint("payments", __name__, url_prefix="/dashboard/payments")
 
+# How long browsers may reuse a catalogue response before revalidating it
+CATALOGUE_MAX_AGE = 60 * 60
+
 
 def get_nowpayments_service() -> NOWPaymentsService:
-    """Initialize NOWPayments service with app config"""
-    return NOWPaymentsService(
-        api_key=current_app.config["NOWPAYMENTS_API_KEY"],
-        ipn_secret=current_app.config["NOWPAYMENTS_IPN_SECRET"],
-        sandbox=current_app.config.get("NOWPAYMENTS_SANDBOX", False)
-    )
+    """The process-wide NOWPayments client built by the app factory"""
+    return current_app.extensions["nowpayments"]
+
+
+def get_currency_catalogue() -> CurrencyCatalogue:
+    """The process-wide cached currency catalogue built by the app factory"""
+    return current_app.extensions["currency_catalogue"]
+
+
+def get_estimate_engine() -> EstimateEngine:
+    """The process-wide estimate engine built by the app factory"""
+    return current_app.extensions["estimate_engine"]
 
 
 # ============= Payment Creation Routes =============
@@ -69,7 +86,8 @@ def create_deposit():
                 "error": "Amount must be a valid number."
             }), 400
 
-        if amount <= 0:
+        # float() accepts "nan" and "inf", and NaN compares False against everything
+        if not math.isfinite(amount) or amount <= 0:
             return jsonify({
                 "success": False,
                 "error": "Amount must be greater than zero."
@@ -335,14 +353,23 @@ def _sync_payment_status(payment: CryptoPayment) -> bool:
             return False
 
         np_service = get_nowpayments_service()
-        old_status = payment.payment_status
 
         # Poll the single endpoint we're authorised to use
         status_response = np_service.get_payment_status(int(payment.payment_id))
         new_status = status_response.get("payment_status")
 
-        if not new_status or new_status == old_status:
-            # No change — nothing to do
+        # Re-read the status under the row lock: an IPN worker (in any process)
+        # may have moved the payment while we were waiting on NOWPayments
+        payment = _lock_payment(CryptoPayment.id == payment.id)
+        old_status = payment.payment_status
+
+        if not PaymentStatus.is_advance(old_status, new_status):
+            # No change (or an older status than an IPN already gave us) — nothing to do
+            db.session.rollback()
+            return False
+
+        if not _advance_payment_status(payment, old_status, new_status):
+            db.session.rollback()
             return False
 
         # Status has changed — update all relevant fields from the response
@@ -350,7 +377,6 @@ def _sync_payment_status(payment: CryptoPayment) -> bool:
             f"Status sync: {payment.order_id} {old_status} → {new_status}"
         )
 
-        payment.payment_status = new_status
         payment.updated_at = datetime.now(timezone.utc)
 
         # Sync additional payment fields if NOWPayments returned them
@@ -368,14 +394,10 @@ def _sync_payment_status(payment: CryptoPayment) -> bool:
         # This self-heals cases where the IPN arrived but the status handler
         # failed (e.g. email error), or where status advanced past "confirmed"
         # to "finished" before a webhook arrived for that specific transition
-        if is_payment_completed(payment):
-            handle_payment_completed(payment)
-        elif is_payment_failed(payment):
-            handle_payment_failed(payment)
-        elif new_status == PaymentStatus.EXPIRED:
-            handle_payment_expired(payment)
+        _run_status_handlers(payment, old_status)
 
         db.session.commit()
+        _publish_payment_status(payment)
         return True
 
     except Exception as e:
@@ -408,6 +430,11 @@ def ipn_callback():
     """
     Handle IPN (Instant Payment Notification) callbacks from NOWPayments
     This endpoint should be publicly accessible (no @login_required)
+
+    Verifies the signature and stores the callback, then applies it inline
+    (see apply_ipn_event) or, with IPN workers configured, hands it to them so
+    NOWPayments gets its 200 within milliseconds (app/utils/ipn_queue.py).
+    A callback that was not applied answers 500, so NOWPayments retries it.
     """
     try:
         # Get raw request data and signature
@@ -419,97 +446,240 @@ def ipn_callback():
             current_app.logger.warning("IPN callback received with no signature header")
             return jsonify({"error": "Missing x-nowpayments-sig header"}), 400
 
-        # Verify and process callback
+        # Verify callback (a pure HMAC check, no network or DB work)
         np_service = get_nowpayments_service()
         callback_data = np_service.process_ipn_callback(request_data, signature)
 
         incoming_payment_id = str(callback_data.get("payment_id")) if callback_data.get("payment_id") else None
         incoming_invoice_id = str(callback_data.get("invoice_id")) if callback_data.get("invoice_id") else None
+        incoming_status = callback_data.get("payment_status")
+
+        # Persist durably before acknowledging; a crash after this point loses
+        # nothing. One INSERT and one commit: the unique content_hash turns a
+        # byte-identical retry into an IntegrityError instead of costing every
+        # new callback a lookup first
+        content_hash = ipn_payload_hash(callback_data)
+        event = IpnEvent(
+            payment_id=incoming_payment_id,
+            invoice_id=incoming_invoice_id,
+            payment_status=incoming_status,
+            ipn_key=ipn_key(incoming_payment_id, incoming_invoice_id, incoming_status),
+            payload=callback_data,
+            content_hash=content_hash,
+            signature=signature
+        )
+        db.session.add(event)
+        try:
+            db.session.flush()
+            event_id = event.id  # read before commit() expires it, saving a SELECT
+            db.session.commit()
+        except IntegrityError:
+            # A retry of a callback we already stored: acknowledged if that
+            # copy was applied, and otherwise retried now (NOWPayments'
+            # redelivery is our retry)
+            db.session.rollback()
+            stored_id = db.session.scalar(select(IpnEvent.id).where(IpnEvent.content_hash == content_hash))
+            return _ipn_response(ipn_queue.redeliver(stored_id))
+
+        return _ipn_response(ipn_queue.enqueue(event_id))
 
-        payment = None
-
-        # Step 1: Try by payment_id
-        # Handles: repeat IPNs after the first one has saved the payment_id
-        if incoming_payment_id:
-            payment = CryptoPayment.query.filter_by(
-                payment_id=incoming_payment_id
-            ).first()
-
-        # Step 2: Try by invoice_id if payment_id lookup missed
-        # Handles: the very first IPN for any invoice-based payment
-        if not payment and incoming_invoice_id:
-            payment = CryptoPayment.query.filter_by(
-                invoice_id=incoming_invoice_id
-            ).first()
-
-            if payment and incoming_payment_id:
-                # Save the payment_id now so all future IPNs use Step 1
-                payment.payment_id = incoming_payment_id
-                current_app.logger.info(
-                    f"Invoice payment matched via invoice_id={incoming_invoice_id}. "
-                    f"Saved payment_id={incoming_payment_id} for future lookups."
-                )
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"IPN callback processing failed: {str(e)}", exc_info=True)
+        return jsonify({"error": "Internal processing error"}), 500
 
-        if not payment:
-            current_app.logger.warning(
-                f"IPN received for unknown payment — "
-                f"payment_id={incoming_payment_id}, "
-                f"invoice_id={incoming_invoice_id}, "
-                f"order_id={callback_data.get('order_id')}"
-            )
-            # Return 200 so NOWPayments stops retrying — we'll never find this payment
-            return jsonify({"message": "Payment not found, logged for review"}), 200
-
-        # Log callback
-        callback_log = PaymentCallback(
-            payment_db_id=payment.id,
-            payment_id=str(callback_data.get("payment_id")),
-            payment_status=callback_data.get("payment_status"),
-            pay_amount=callback_data.get("pay_amount"),
-            actually_paid=callback_data.get("actually_paid"),
-            callback_data=callback_data,
-            signature=signature,
-            signature_valid=True
-        )
-        db.session.add(callback_log)
 
-        # Update payment status
-        old_status = payment.payment_status
-        new_status = callback_data.get("payment_status")
+def _ipn_response(outcome):
+    """
+    Acknowledge a callback only once it is applied or owned by the IPN workers
 
-        # Update all fields NOWPayments may have new data for
-        payment.payment_status = new_status
-        payment.actually_paid = callback_data.get("actually_paid")
-        payment.pay_amount = callback_data.get("pay_amount")
-        payment.outcome_amount = callback_data.get("outcome_amount")
-        payment.outcome_currency = callback_data.get("outcome_currency")
+    An inline apply that failed (or is still running elsewhere) answers 500, so
+    NOWPayments redelivers it: without workers there is no sweeper, and an
+    acknowledged but unapplied event would never be retried.
+    """
+    if outcome is None or outcome in UNAPPLIED_STATUSES:
+        return jsonify({"error": "Callback stored but not applied yet"}), 500
 
-        # FIX: Assign actual datetime value, not a lambda
-        payment.updated_at = datetime.now(timezone.utc)
+    # Return 200 to acknowledge receipt — NOWPayments expects this
+    return jsonify({"success": True}), 200
+
+
+def apply_ipn_event(event: IpnEvent) -> str:
+    """
+    Apply one stored IPN callback: payment lookup, callback log, status update
+    and the status handlers. Runs inline or on the IPN worker pool — see
+    app/utils/ipn_queue.py. Status handlers only run on an actual status
+    change; a repeat of the current status just records any new amounts.
+
+    Returns:
+        "done"; "stale" for an out-of-order status older than the payment's,
+        "redundant" for a repeat with nothing new, or "unmatched" when no
+        payment matches the callback
+    """
+    callback_data = event.payload
+    incoming_payment_id = event.payment_id
+    incoming_invoice_id = event.invoice_id
+
+    payment = None
+
+    # The payment row is locked (SELECT ... FOR UPDATE) until this transaction
+    # commits, so IPN workers and status polling in other processes queue up
+    # behind us instead of acting on the same old status
+
+    # Step 1: Try by payment_id
+    # Handles: repeat IPNs after the first one has saved the payment_id
+    if incoming_payment_id:
+        payment = _lock_payment(CryptoPayment.payment_id == incoming_payment_id)
 
-        if old_status != new_status:
+    # Step 2: Try by invoice_id if payment_id lookup missed
+    # Handles: the very first IPN for any invoice-based payment
+    if not payment and incoming_invoice_id:
+        payment = _lock_payment(CryptoPayment.invoice_id == incoming_invoice_id)
+
+        if payment and incoming_payment_id:
+            # Save the payment_id now so all future IPNs use Step 1
+            payment.payment_id = incoming_payment_id
             current_app.logger.info(
-                f"Payment {payment.order_id} status: {old_status} → {new_status}"
+                f"Invoice payment matched via invoice_id={incoming_invoice_id}. "
+                f"Saved payment_id={incoming_payment_id} for future lookups."
             )
 
-            if is_payment_completed(payment):
-                handle_payment_completed(payment)
-            elif is_payment_failed(payment):
-                handle_payment_failed(payment)
-            elif new_status == PaymentStatus.EXPIRED:
-                handle_payment_expired(payment)
-            # You can add more handlers here as needed:
-            # elif new_status == PaymentStatus.PARTIALLY_PAID:
-            #     handle_partial_payment(payment)
+    if not payment:
+        current_app.logger.warning(
+            f"IPN received for unknown payment — "
+            f"payment_id={incoming_payment_id}, "
+            f"invoice_id={incoming_invoice_id}, "
+            f"order_id={callback_data.get('order_id')}"
+        )
+        # Kept as an 'unmatched' ipn_events row for review
+        return "unmatched"
+
+    old_status = payment.payment_status
+    new_status = callback_data.get("payment_status")
+
+    # Out-of-order delivery: never move a payment backwards (e.g. finished → confirming)
+    if new_status != old_status and not PaymentStatus.is_advance(old_status, new_status):
+        current_app.logger.info(
+            f"Ignoring stale IPN for {payment.order_id}: {old_status} → {new_status}"
+        )
+        db.session.commit()  # keeps a payment_id saved above
+        return "stale"
+
+    # Same status with nothing new (e.g. we already saw it by polling): nothing to record
+    if new_status == old_status and not _ipn_amounts_changed(payment, callback_data):
+        db.session.commit()
+        return "redundant"
 
+    if new_status != old_status and not _advance_payment_status(payment, old_status, new_status):
+        # Lost the race to another writer (only possible without row locks, i.e. SQLite)
         db.session.commit()
+        return "stale"
+
+    # Log callback
+    callback_log = PaymentCallback(
+        payment_db_id=payment.id,
+        payment_id=str(callback_data.get("payment_id")),
+        payment_status=callback_data.get("payment_status"),
+        pay_amount=callback_data.get("pay_amount"),
+        actually_paid=callback_data.get("actually_paid"),
+        callback_data=callback_data,
+        signature=event.signature,
+        signature_valid=True
+    )
+    db.session.add(callback_log)
 
-        # Return 200 to acknowledge receipt — NOWPayments expects this
-        return jsonify({"success": True}), 200
+    # Update all fields NOWPayments may have new data for
+    payment.payment_status = new_status
+    payment.actually_paid = callback_data.get("actually_paid")
+    payment.pay_amount = callback_data.get("pay_amount")
+    payment.outcome_amount = callback_data.get("outcome_amount")
+    payment.outcome_currency = callback_data.get("outcome_currency")
+
+    # FIX: Assign actual datetime value, not a lambda
+    payment.updated_at = datetime.now(timezone.utc)
+
+    if old_status != new_status:
+        current_app.logger.info(
+            f"Payment {payment.order_id} status: {old_status} → {new_status}"
+        )
+
+        _run_status_handlers(payment, old_status)
+
+    db.session.commit()
+
+    if old_status != new_status:
+        _publish_payment_status(payment)
+
+    return "done"
+
+
+def _lock_payment(*criteria) -> CryptoPayment | None:
+    """
+    Load a payment with its row locked until the transaction ends.
+
+    populate_existing refreshes an instance this session already holds, so the
+    caller always sees the committed status rather than a copy read earlier.
+    """
+    return db.session.scalar(
+        select(CryptoPayment)
+        .where(*criteria)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+
+
+def _advance_payment_status(payment: CryptoPayment, old_status: str, new_status: str) -> bool:
+    """
+    Compare-and-set the payment status; False if it is no longer old_status.
+
+    Under the row lock this always succeeds. SQLite has no row locks, and there
+    the WHERE on the old status stops two writers both acting on it.
+    """
+    result = db.session.execute(
+        update(CryptoPayment)
+        .where(CryptoPayment.id == payment.id, CryptoPayment.payment_status == old_status)
+        .values(payment_status=new_status)
+    )
+    if result.rowcount != 1:
+        return False
+    payment.payment_status = new_status
+    return True
+
+
+def _ipn_amounts_changed(payment: CryptoPayment, callback_data: dict) -> bool:
+    """True if a callback carries amounts that differ from what we stored"""
+    return any(
+        callback_data.get(field) is not None and callback_data.get(field) != getattr(payment, field)
+        for field in ("actually_paid", "pay_amount", "outcome_amount", "outcome_currency")
+    )
+
+
+def _run_status_handlers(payment: CryptoPayment, old_status: str):
+    """
+    Business logic for a status change (shared by the IPN worker and status polling).
+
+    Runs each outcome's side effects once per payment: completion fires on
+    whichever of confirmed / sending / finished arrives first (IPNs can come
+    out of order), and later ones do not credit, notify or email again.
+    """
+    new_status = payment.payment_status
+    if new_status in PaymentStatus.SETTLED_STATUSES:
+        if old_status not in PaymentStatus.SETTLED_STATUSES:
+            handle_payment_completed(payment)
+    elif new_status == PaymentStatus.EXPIRED:
+        # Checked before failed: is_payment_failed() also counts expired payments
+        handle_payment_expired(payment)
+    elif is_payment_failed(payment):
+        handle_payment_failed(payment)
+    # You can add more handlers here as needed:
+    # elif new_status == PaymentStatus.PARTIALLY_PAID:
+    #     handle_partial_payment(payment)
+
+
+def _publish_payment_status(payment: CryptoPayment):
+    """Push a committed status change to the owner's open event streams"""
+    broker.publish(payment.user_id, "payment_status", payment_to_dict(payment))
 
-    except Exception as e:
-        current_app.logger.error(f"IPN callback processing failed: {str(e)}", exc_info=True)
-        return jsonify({"error": "Internal processing error"}), 500
 
 # ============= Success/Cancel Routes =============
 
@@ -660,18 +830,27 @@ def handle_payment_expired(payment: CryptoPayment):
 
 # ============= API Routes (for AJAX) =============
 
+def _catalogue_response(payload):
+    """JSON response browsers can cache and revalidate with If-None-Match"""
+    response = jsonify(payload)
+    response.cache_control.private = True
+    response.cache_control.max_age = CATALOGUE_MAX_AGE
+    response.add_etag()
+    return response.make_conditional(request)
+
+
 @payment_bp.route("/api/currencies", methods=["GET"])
 @login_required
 def get_currencies():
     """
     Return the list of cryptocurrencies available for payment.
     Used by the deposit modal to populate the currency selector dropdown.
+    Served from the cached catalogue, so opening the modal costs no upstream call.
     """
     try:
-        np_service = get_nowpayments_service()
-        currencies = np_service.get_available_currencies()
+        currencies = get_currency_catalogue().currencies()
 
-        return jsonify({
+        return _catalogue_response({
             "success": True,
             "currencies": currencies
         })
@@ -680,6 +859,47 @@ def get_currencies():
         return jsonify({"error": str(e)}), 500
 
 
+@payment_bp.route("/api/currencies/checked", methods=["GET"])
+@login_required
+def get_checked_currencies():
+    """Return the currencies enabled for our merchant account (cached)"""
+    try:
+        currencies = get_currency_catalogue().checked_currencies()
+
+        return _catalogue_response({
+            "success": True,
+            "currencies": currencies
+        })
+    except Exception as e:
+        current_app.logger.error(f"Failed to fetch checked currencies: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@payment_bp.route("/api/min-amount", methods=["GET"])
+@login_required
+def get_minimum_amount():
+    """
+    Return the minimum payment amount for a currency pair (cached).
+
+    Query string: ?currency_from=usd&currency_to=eth
+    """
+    currency_from = request.args.get("currency_from", "").strip()
+    currency_to = request.args.get("currency_to", "").strip()
+    if not currency_from or not currency_to:
+        return jsonify({"error": "currency_from and currency_to are required."}), 400
+
+    try:
+        minimum = get_currency_catalogue().minimum_amount(currency_from, currency_to)
+
+        return _catalogue_response({
+            "success": True,
+            "minimum": minimum
+        })
+    except Exception as e:
+        current_app.logger.error(f"Minimum amount request failed: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
 @payment_bp.route("/api/estimate", methods=["POST"])
 @login_required
 def get_estimate():
@@ -699,11 +919,21 @@ def get_estimate():
         if not data:
             return jsonify({"error": "Request body must be valid JSON."}), 400
 
-        np_service = get_nowpayments_service()
-        estimate = np_service.get_estimate(
-            amount=float(data["amount"]),
-            currency_from=data["currency_from"],
-            currency_to=data["currency_to"]
+        try:
+            amount = float(data["amount"])
+            currency_from = str(data["currency_from"])
+            currency_to = str(data["currency_to"])
+        except (KeyError, ValueError, TypeError):
+            return jsonify({"error": "amount, currency_from and currency_to are required."}), 400
+        if not math.isfinite(amount) or amount <= 0:
+            return jsonify({"error": "Amount must be greater than zero."}), 400
+
+        # Computed locally from a rate fetched at most every few seconds per pair
+        estimate = get_estimate_engine().estimate(
+            amount=amount,
+            currency_from=currency_from,
+            currency_to=currency_to,
+            user_id=current_user.id
         )
 
         return jsonify({
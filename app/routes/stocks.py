@@ -0,0 +1,179 @@
+from flask import Blueprint, Response, abort, jsonify, request, send_file
+from flask_login import login_required
+from app import limiter
+import math
+import numpy as np
+from app.utils.indicators import INDICATORS, indicator_engine
+from app.utils.logo_cache import LOGO_MIMETYPES, placeholder_svg
+from app.utils.stocks_api import api
+
+stocks_bp = Blueprint("stocks", __name__)
+
+MAX_SYMBOLS_PER_REQUEST = 100
+MAX_DAYS_BACK = 5 * 365
+MAX_SEARCH_RESULTS = 25
+LOGO_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def _to_json_list(values):
+    """NumPy array -> list with NaN replaced by None (NaN is not valid JSON)"""
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+def _indicator_params(args):
+    """
+    Kernel parameters from the query string
+
+    Raises:
+        ValueError: A parameter is not a positive number, or fast >= slow
+    """
+    params = {}
+    for name in ("window", "span", "fast", "slow", "signal"):
+        if name in args:
+            value = args.get(name, type=int)
+            if value is None or value < 1:
+                raise ValueError(f"{name} must be a whole number of at least 1")
+            params[name] = value
+    if "num_std" in args:
+        value = args.get("num_std", type=float)
+        if value is None or not math.isfinite(value) or value <= 0:
+            raise ValueError("num_std must be a number greater than 0")
+        params["num_std"] = value
+    if params.get("fast", 12) >= params.get("slow", 26):
+        raise ValueError("fast must be smaller than slow")
+    return params
+
+
+# ============================================================================
+# API ROUTES
+# ============================================================================
+
+@stocks_bp.route("/api/stocks/<string:symbol>/candles", methods=["GET"])
+@login_required
+def get_candles(symbol):
+    """OHLCV chart data, served from the local candle store when possible"""
+    symbol = symbol.strip().upper()
+    resolution = request.args.get("resolution", "D")
+    days = min(max(request.args.get("days", 30, type=int), 1), MAX_DAYS_BACK)
+
+    try:
+        candles = api.get_candles(symbol, resolution=resolution, days_back=days)
+    except ValueError as e:
+        # Invalid symbol or unknown resolution
+        return jsonify({"success": False, "message": str(e)}), 400
+    if candles is None:
+        return jsonify({"success": False, "message": "No chart data"}), 404
+
+    return jsonify({"success": True, "symbol": symbol, "candles": candles})
+
+
+@stocks_bp.route("/api/stocks/search", methods=["GET"])
+@login_required
+@limiter.limit("30 per minute")  # replaces the 50/hour default: typeahead sends one per (debounced) keystroke
+def search_stocks():
+    """
+    Ticker / company / industry typeahead
+
+    Served from the in-memory index, so it is cheap; clients should still
+    debounce keystrokes (~250 ms) before calling it.
+
+    Query params:
+        q: Search text (prefix of a ticker or of any word in the name/industry)
+        limit: Maximum results (default 10, at most MAX_SEARCH_RESULTS)
+    """
+    query = request.args.get("q", "").strip()
+    limit = min(max(request.args.get("limit", 10, type=int), 1), MAX_SEARCH_RESULTS)
+    if not query:
+        return jsonify({"success": True, "query": query, "results": []})
+
+    return jsonify({"success": True, "query": query, "results": api.search_stocks(query, limit=limit)})
+
+
+@stocks_bp.route("/api/stocks/indicators", methods=["GET"])
+@login_required
+def get_indicators():
+    """
+    Technical indicators for many symbols in one batched call
+
+    Query params:
+        symbols: Comma-separated tickers (required, at most MAX_SYMBOLS_PER_REQUEST)
+        indicator: One of sma, ema, rsi, macd, bollinger, vwap, volatility
+        resolution, days: Candle resolution and look-back (at most MAX_DAYS_BACK)
+        window / span / fast / slow / signal / num_std: Kernel parameters
+    """
+    indicator = request.args.get("indicator", "sma")
+    if indicator not in INDICATORS:
+        return jsonify({
+            "success": False,
+            "message": f"Unknown indicator. Choose one of: {', '.join(INDICATORS)}"
+        }), 400
+
+    # Symbols without stored candles are fetched inside the request, so the
+    # caller has to name them rather than getting the whole universe
+    symbols = [s.strip().upper() for s in request.args.get("symbols", "").split(",") if s.strip()]
+    if not symbols:
+        return jsonify({"success": False, "message": "symbols is required"}), 400
+    symbols = symbols[:MAX_SYMBOLS_PER_REQUEST]
+
+    days = min(max(request.args.get("days", 90, type=int), 1), MAX_DAYS_BACK)
+
+    try:
+        params = _indicator_params(request.args)
+        results = indicator_engine.compute(
+            symbols,
+            indicator,
+            resolution=request.args.get("resolution", "D"),
+            days_back=days,
+            **params
+        )
+    except (TypeError, ValueError) as e:
+        # Invalid parameter, or one that this indicator does not accept
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    return jsonify({
+        "success": True,
+        "indicator": indicator,
+        "results": {
+            symbol: {name: _to_json_list(values) for name, values in outputs.items()}
+            for symbol, outputs in results.items()
+        }
+    })
+
+
+# ============================================================================
+# LOGOS
+# ============================================================================
+
+@stocks_bp.route("/logos/<string:filename>", methods=["GET"])
+@limiter.exempt  # immutable, content-addressed files: a dashboard loads dozens at once
+def logo(filename):
+    """
+    Cached company logo (see app/utils/logo_cache.py)
+
+    File names are content hashes, so the response can be cached forever:
+    the ETag is the hash and a changed logo gets a new URL.
+    """
+    path = api.logos.path(filename)
+    if path is None:
+        abort(404)
+    response = send_file(
+        path,
+        mimetype=LOGO_MIMETYPES[path.suffix],
+        etag=path.stem,
+        conditional=True,
+        max_age=LOGO_MAX_AGE
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@stocks_bp.route("/logos/placeholder/<string:symbol>.svg", methods=["GET"])
+@limiter.exempt
+def logo_placeholder(symbol):
+    """Generated monogram for symbols without a usable logo"""
+    response = Response(placeholder_svg(symbol.upper()), mimetype="image/svg+xml")
+    response.cache_control.public = True
+    response.cache_control.max_age = 7 * 24 * 60 * 60  # the real logo may show up later
+    response.add_etag()
+    return response.make_conditional(request)
@@ -0,0 +1,102 @@
+import threading
+import time
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache where every entry expires after `ttl` seconds
+
+    Callers can ask for a tighter freshness bound per lookup with `max_age`,
+    so one cache can serve both "anything from today" and "last few seconds".
+    """
+
+    def __init__(self, ttl, maxsize=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = {}  # key -> (value, stored_at)
+        self._lock = threading.Lock()
+
+    def get(self, key, max_age=None, default=None):
+        """Return the cached value if it is younger than max_age (defaults to ttl)"""
+        entry = self.get_entry(key)
+        if entry is None:
+            return default
+
+        value, age = entry
+        if age > (self.ttl if max_age is None else max_age):
+            return default
+        return value
+
+    def get_entry(self, key):
+        """Return (value, age_in_seconds) even if expired, or None if never cached"""
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        return value, time.monotonic() - stored_at
+
+    def set(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            if self.maxsize and len(self._data) >= self.maxsize:
+                # Dicts keep insertion order, so the first key is the oldest write
+                self._data.pop(next(iter(self._data)))
+            self._data[key] = (value, time.monotonic())
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one execution
+
+    The first caller (the leader) runs the function; everyone who asks for the
+    same key while it is in flight waits and receives the leader's result (or
+    exception). Nothing is cached afterwards, so the next call runs again.
+    """
+
+    class _Call:
+        __slots__ = ("done", "result", "error")
+
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
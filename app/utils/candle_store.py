@@ -0,0 +1,132 @@
+import json
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+import numpy as np
+
+# Row order of the on-disk (6, n) array; each row is one contiguous column
+CANDLE_FIELDS = ("timestamps", "open", "high", "low", "close", "volume")
+FINNHUB_FIELDS = ("t", "o", "h", "l", "c", "v")
+
+# Bar length in seconds for each Finnhub resolution
+RESOLUTION_SECONDS = {
+    "1": 60, "5": 300, "15": 900, "30": 1800, "60": 3600,
+    "D": 86400, "W": 7 * 86400, "M": 30 * 86400,
+}
+
+# Tickers as exchanges write them (BRK.B, BF-B); file names are built from these
+SYMBOL_PATTERN = re.compile(r"^[A-Z0-9.\-]{1,12}$")
+
+
+def validate_candle_key(symbol, resolution):
+    """
+    Raises:
+        ValueError: symbol is not a plain ticker or resolution is not in RESOLUTION_SECONDS
+    """
+    if resolution not in RESOLUTION_SECONDS:
+        raise ValueError(f"Unknown resolution. Choose one of: {', '.join(RESOLUTION_SECONDS)}")
+    if not isinstance(symbol, str) or not SYMBOL_PATTERN.match(symbol):
+        raise ValueError(f"Invalid symbol: {symbol!r}")
+
+
+class CandleStore:
+    """
+    Columnar on-disk OHLCV store, one memory-mapped .npy file per (symbol, resolution)
+
+    Each file holds a float64 array of shape (6, n) sorted by timestamp, so a
+    column is a contiguous row and a time range is a searchsorted slice. A JSON
+    sidecar records the time range that has already been fetched, so callers
+    only ask Finnhub for the parts they do not have yet. Files are replaced
+    atomically (temp file + rename) and readers keep a valid mapping throughout.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._arrays = {}  # key -> (mtime_ns, memory-mapped array)
+        self._lock = threading.Lock()
+
+    def _paths(self, symbol, resolution):
+        # Both parts end up in a file name, so never trust them unchecked
+        validate_candle_key(symbol, resolution)
+        stem = f"{symbol}_{resolution}"
+        return self.directory / f"{stem}.npy", self.directory / f"{stem}.json"
+
+    def load(self, symbol, resolution):
+        """Return the memory-mapped (6, n) array (empty if nothing is stored)"""
+        data_path, _ = self._paths(symbol, resolution)
+        try:
+            mtime = data_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return np.empty((len(CANDLE_FIELDS), 0))
+
+        key = (symbol, resolution)
+        cached = self._arrays.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        array = np.load(data_path, mmap_mode="r")
+        self._arrays[key] = (mtime, array)
+        return array
+
+    def coverage(self, symbol, resolution):
+        """(from, to) epoch seconds already fetched, or None"""
+        _, meta_path = self._paths(symbol, resolution)
+        try:
+            meta = json.loads(meta_path.read_text())
+            return meta["from"], meta["to"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+
+    def merge(self, symbol, resolution, block, covered_from, covered_to):
+        """
+        Merge newly fetched bars into the stored array
+
+        Args:
+            block: (6, m) array of new bars; on duplicate timestamps these win
+            covered_from, covered_to: Time range the fetch covered (extends coverage)
+        """
+        with self._lock:
+            existing = np.asarray(self.load(symbol, resolution))
+            combined = np.hstack([block, existing]) if block.size else existing
+
+            # np.unique returns the first occurrence, i.e. the freshly fetched bar
+            _, first = np.unique(combined[0], return_index=True)
+            merged = np.ascontiguousarray(combined[:, first])
+
+            coverage = self.coverage(symbol, resolution)
+            if coverage:
+                covered_from = min(covered_from, coverage[0])
+                covered_to = max(covered_to, coverage[1])
+
+            data_path, meta_path = self._paths(symbol, resolution)
+            self._atomic_write(data_path, lambda f: np.save(f, merged))
+            self._atomic_write(
+                meta_path,
+                lambda f: f.write(json.dumps({"from": covered_from, "to": covered_to}).encode())
+            )
+            return merged
+
+    def _atomic_write(self, path, write):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def slice(self, symbol, resolution, start, end):
+        """Return the (6, k) view of bars with start <= timestamp <= end"""
+        array = self.load(symbol, resolution)
+        lo = np.searchsorted(array[0], start, side="left")
+        hi = np.searchsorted(array[0], end, side="right")
+        return array[:, lo:hi]
+
+
+def candles_to_block(candles):
+    """Convert a Finnhub /stock/candle response into a (6, m) float64 array"""
+    return np.array([candles.get(field, []) for field in FINNHUB_FIELDS], dtype=np.float64)
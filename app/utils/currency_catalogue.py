@@ -0,0 +1,86 @@
+import threading
+from app.utils.cache import SingleFlight, TTLCache
+
+
+class CurrencyCatalogue:
+    """
+    Cached NOWPayments currency lists and per-pair minimum amounts
+
+    These change maybe once a day, so they are served from memory. After
+    `ttl` seconds (`min_amount_ttl` for minimums) an entry is stale: callers
+    still get it straight away while one background thread refreshes it. If
+    NOWPayments is down the stale value simply keeps being served, so the
+    deposit modal never waits on, or breaks because of, the upstream API.
+    Only a cold cache calls upstream inline.
+
+    Usage:
+        catalogue = CurrencyCatalogue(service)
+        catalogue.currencies()                  # ['btc', 'eth', ...]
+        catalogue.minimum_amount('usd', 'btc')  # {'min_amount': ..., ...}
+    """
+
+    def __init__(self, service, ttl=6 * 60 * 60, min_amount_ttl=60 * 60):
+        self.service = service
+        self.ttl = ttl
+        self.min_amount_ttl = min_amount_ttl
+        self._cache = TTLCache(ttl=ttl, maxsize=1024)  # read with get_entry, so stale entries stay usable
+        self._inflight = SingleFlight()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    # ============= Lookups =============
+
+    def currencies(self):
+        """All currencies NOWPayments supports"""
+        return self._lookup(("currencies",), self.ttl, self.service.get_available_currencies)
+
+    def checked_currencies(self):
+        """Currencies enabled for our merchant account"""
+        return self._lookup(("checked",), self.ttl, self.service.get_available_checked_currencies)
+
+    def minimum_amount(self, currency_from, currency_to):
+        """Minimum payment amount for a currency pair"""
+        currency_from, currency_to = currency_from.lower(), currency_to.lower()
+        return self._lookup(
+            ("min_amount", currency_from, currency_to), self.min_amount_ttl,
+            self.service.get_minimum_payment_amount, currency_from, currency_to
+        )
+
+    def invalidate(self):
+        self._cache.clear()
+
+    # ============= Refreshing =============
+
+    def _lookup(self, key, ttl, fetch, *args):
+        entry = self._cache.get_entry(key)
+        if entry is None:
+            # Cold: fetch inline, sharing one upstream call between concurrent callers
+            return self._inflight.do(key, self._fetch, key, fetch, *args)
+
+        value, age = entry
+        if age > ttl:
+            self._refresh_in_background(key, fetch, *args)
+        return value
+
+    def _fetch(self, key, fetch, *args):
+        value = fetch(*args)
+        self._cache.set(key, value)
+        return value
+
+    def _refresh_in_background(self, key, fetch, *args):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._inflight.do(key, self._fetch, key, fetch, *args)
+            except Exception as e:
+                # Keep serving the stale value; the next lookup tries again
+                print(f"Currency catalogue refresh failed for {key}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name="currency-catalogue-refresh", daemon=True).start()
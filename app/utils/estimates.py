@@ -0,0 +1,74 @@
+import math
+import threading
+from app.utils.cache import SingleFlight, TTLCache
+
+
+class EstimateEngine:
+    """
+    Local exchange estimates from a short-lived per-pair rate table
+
+    The deposit modal asks for an estimate on every keystroke. Instead of
+    proxying each one to NOWPayments, the engine fetches one estimate per
+    (currency_from, currency_to), keeps the implied rate for `rate_ttl`
+    seconds and multiplies locally. Concurrent misses for the same pair share
+    one upstream call, and a user who already triggered a fetch within
+    `user_debounce` seconds is served the previous (slightly stale) rate
+    rather than starting another.
+
+    Usage:
+        engine.estimate(100, 'usd', 'eth', user_id=current_user.id)
+    """
+
+    def __init__(self, service, rate_ttl=10, user_debounce=2, max_pairs=1024, max_users=10000):
+        self.service = service
+        self.rate_ttl = rate_ttl
+        self.user_debounce = user_debounce
+        self._rates = TTLCache(ttl=rate_ttl, maxsize=max_pairs)  # pair -> rate, read with get_entry
+        self._recent_fetches = TTLCache(ttl=user_debounce, maxsize=max_users)  # user_id -> True
+        self._inflight = SingleFlight()
+        self.upstream_calls = 0
+        self._lock = threading.Lock()
+
+    def estimate(self, amount, currency_from, currency_to, user_id=None):
+        """
+        Estimated amount of currency_to for `amount` of currency_from
+
+        Returns:
+            Dict shaped like NOWPayments' /estimate response
+        """
+        amount = float(amount)
+        if not math.isfinite(amount) or amount <= 0:
+            raise ValueError("Amount must be greater than zero.")
+        pair = (currency_from.lower(), currency_to.lower())
+
+        rate = self.rate(pair, amount, user_id)
+        return {
+            "currency_from": pair[0],
+            "amount_from": amount,
+            "currency_to": pair[1],
+            "estimated_amount": round(amount * rate, 8)
+        }
+
+    def rate(self, pair, amount, user_id=None):
+        """Units of pair[1] per unit of pair[0], fetched at most once per rate_ttl"""
+        entry = self._rates.get_entry(pair)
+        if entry is not None:
+            rate, age = entry
+            if age <= self.rate_ttl:
+                return rate
+            if user_id is not None and self._recent_fetches.get(user_id):
+                return rate  # debounced: this user just paid for a fetch
+
+        if user_id is not None:
+            self._recent_fetches.set(user_id, True)
+        return self._inflight.do(pair, self._fetch_rate, pair, amount)
+
+    def _fetch_rate(self, pair, amount):
+        with self._lock:
+            self.upstream_calls += 1
+        response = self.service.get_estimate(amount=amount, currency_from=pair[0], currency_to=pair[1])
+        amount_from = float(response.get("amount_from") or amount)
+        estimated = float(response["estimated_amount"])
+        rate = estimated / amount_from
+        self._rates.set(pair, rate)
+        return rate
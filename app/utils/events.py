@@ -0,0 +1,241 @@
+import json
+import os
+import queue
+import threading
+import time
+import weakref
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+
+class EventBroker:
+    """
+    In-process fan-out of live events to Server-Sent Events connections
+
+    Each open stream owns a bounded queue. `publish` targets one user's
+    streams (notifications, payment status), `broadcast` goes to every stream
+    (quote ticks; streams filter by the symbols they asked for). A slow client
+    drops its oldest events instead of blocking the publisher.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._streams = {}  # user_id -> set of queues
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        stream = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._streams.setdefault(user_id, set()).add(stream)
+        return stream
+
+    def unsubscribe(self, user_id, stream):
+        with self._lock:
+            streams = self._streams.get(user_id)
+            if streams:
+                streams.discard(stream)
+                if not streams:
+                    del self._streams[user_id]
+
+    def publish(self, user_id, name, data):
+        self._deliver(user_id, name, data)
+
+    def broadcast(self, name, data):
+        self._deliver(None, name, data)
+
+    def _deliver(self, user_id, name, data):
+        with self._lock:
+            if user_id is None:
+                targets = [s for streams in self._streams.values() for s in streams]
+            else:
+                targets = list(self._streams.get(user_id, ()))
+
+        for stream in targets:
+            try:
+                stream.put_nowait((name, data))
+            except queue.Full:
+                try:
+                    stream.get_nowait()  # drop the oldest event
+                except queue.Empty:
+                    pass
+                stream.put_nowait((name, data))
+
+
+class RedisEventBroker(EventBroker):
+    """
+    EventBroker that relays events through Redis pub/sub
+
+    A notification created in one gunicorn worker reaches a stream held open
+    by another: every process publishes to one channel and a listener thread
+    in each process delivers to its local streams. The listener starts with
+    the first stream in a process (so it lives in forked workers, not a
+    --preload master) and reconnects with backoff when Redis drops it.
+    """
+
+    def __init__(self, client, channel="events", queue_size=100, max_backoff=30):
+        from redis import RedisError
+
+        super().__init__(queue_size)
+        self.client = client
+        self.channel = channel
+        self.max_backoff = max_backoff
+        self._errors = RedisError
+        self._listener = None
+        self._listener_pid = None
+        self._start_lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        self._ensure_listener()
+        return super().subscribe(user_id)
+
+    def _ensure_listener(self):
+        """Start the pub/sub thread in this process if it is not running (threads do not survive a fork)"""
+        if self._listener_pid == os.getpid() and self._listener.is_alive():
+            return
+        with self._start_lock:
+            if self._listener_pid == os.getpid() and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(target=self._listen, name="event-broker", daemon=True)
+            self._listener_pid = os.getpid()
+            self._listener.start()
+
+    def publish(self, user_id, name, data):
+        try:
+            self.client.publish(
+                self.channel, json.dumps({"user_id": user_id, "name": name, "data": data}, default=str)
+            )
+        except self._errors as e:
+            # Publishing runs from after_commit: never fail the caller's commit.
+            # Streams in this process still get the event.
+            print(f"Redis event publish failed ({e}), delivering locally only")
+            self._deliver(user_id, name, data)
+
+    def broadcast(self, name, data):
+        # Quote ticks come from each process's own feed, so keep them local
+        self._deliver(None, name, data)
+
+    def _listen(self):
+        backoff = 1
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                backoff = 1
+                for message in pubsub.listen():
+                    try:
+                        payload = json.loads(message["data"])
+                        self._deliver(payload["user_id"], payload["name"], payload["data"])
+                    except (ValueError, KeyError, TypeError) as e:
+                        print(f"Ignoring malformed event: {e}")
+            except self._errors as e:
+                print(f"Redis event listener disconnected ({e}), reconnecting in {backoff}s")
+            finally:
+                try:
+                    pubsub.close()
+                except self._errors:
+                    pass
+
+            time.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+
+def create_event_broker(redis_url=None):
+    """Redis-backed broker when available (multi-worker), in-process otherwise"""
+    if redis_url:
+        try:
+            import redis
+
+            client = redis.Redis.from_url(redis_url, socket_connect_timeout=2)
+            client.ping()
+            return RedisEventBroker(client)
+        except Exception as e:
+            print(f"Redis event broker unavailable ({e}), using in-process broker")
+
+    return EventBroker()
+
+
+def format_sse(name, data):
+    """Encode one Server-Sent Events message"""
+    return f"event: {name}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+# ============= Notification hooks =============
+
+def init_event_hooks():
+    """
+    Push every new Notification to its user's streams once it is committed
+
+    Hooked on the model rather than each create_* helper so no code path is
+    missed. Rows are collected at insert time (while attributes are loaded)
+    and only published after commit, so rolled-back notifications never leak.
+    """
+    from app.models.notification import Notification
+
+    if event.contains(Notification, "after_insert", _collect_notification):
+        return
+    event.listen(Notification, "after_insert", _collect_notification)
+    event.listen(Session, "after_commit", _publish_collected)
+    event.listen(Session, "after_rollback", _discard_collected)
+
+
+def _collect_notification(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("pending_events", []).append((target.user_id, {
+            "id": target.id,
+            "type": target.type,
+            "category": target.category,
+            "priority": target.priority,
+            "title": target.title,
+            "message": target.message,
+            "action_text": target.action_text,
+            "action_url": target.action_url
+        }))
+
+
+def _publish_collected(session):
+    # Runs inside commit(): an error here would surface from an unrelated write
+    for user_id, data in session.info.pop("pending_events", []):
+        try:
+            broker.publish(user_id, "notification", data)
+        except Exception as e:
+            print(f"Notification event for user {user_id} not published: {e}")
+
+
+def _discard_collected(session):
+    session.info.pop("pending_events", None)
+
+
+# ============= Quote ticks =============
+
+# feed -> its relay listener, so relay_quotes() registers at most one per feed
+_quote_relays = weakref.WeakKeyDictionary()
+
+
+def relay_quotes(feed, min_interval=1.0):
+    """
+    Broadcast quote feed trades as 'quote' events, at most one per symbol per
+    `min_interval` seconds (busy symbols trade far faster than a page repaints)
+
+    Idempotent per feed: create_app() can run more than once in a process
+    (the reloader, tests, CLI commands), and a second listener on the same
+    feed would broadcast every trade twice.
+    """
+    if feed in _quote_relays:
+        return _quote_relays[feed]
+
+    last_sent = {}
+
+    def on_trade(trade):
+        now = time.monotonic()
+        if now - last_sent.get(trade["symbol"], 0) >= min_interval:
+            last_sent[trade["symbol"]] = now
+            broker.broadcast("quote", trade)
+
+    feed.add_listener(on_trade)
+    _quote_relays[feed] = on_trade
+    return on_trade
+
+
+# ==================== MODULE-LEVEL INITIALIZATION ====================
+broker = create_event_broker(os.environ.get("REDIS_URL"))
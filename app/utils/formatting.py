@@ -0,0 +1,65 @@
+from collections import namedtuple
+from functools import lru_cache
+
+
+def _compact(num):
+    if num >= 1_000_000_000_000:
+        return f"{num/1_000_000_000_000:.1f}T"
+    elif num >= 1_000_000_000:
+        return f"{num/1_000_000_000:.1f}B"
+    elif num >= 1_000_000:
+        return f"{num/1_000_000:.1f}M"
+    elif num >= 1_000:
+        return f"{num/1_000:.1f}K"
+    else:
+        return f"{num:.2f}"
+
+
+@lru_cache(maxsize=4096)
+def _format_number_cached(num):
+    return _compact(float(num))
+
+
+def format_number(num):
+    """
+    Compact display of a number (1234567 -> '1.2M'), registered as the
+    `compact` Jinja filter; non-numeric input is returned unchanged
+    """
+    try:
+        return _format_number_cached(num)
+    except (TypeError, ValueError, OverflowError):
+        return num  # fallback for non-numeric input
+
+
+@lru_cache(maxsize=4096)
+def _format_currency_cached(value):
+    return "${:,.2f}".format(float(value))
+
+
+def format_currency(value):
+    """'$1,234.50' display of an amount, registered as the `currency` Jinja filter"""
+    try:
+        return _format_currency_cached(value)
+    except TypeError:  # unhashable input: format without the cache
+        return "${:,.2f}".format(float(value))
+
+
+# Display strings for one stock, computed once per cached record
+StockDisplay = namedtuple("StockDisplay", [
+    "price", "change", "percent_change", "market_cap", "change_class"
+])
+
+
+def stock_display(stock):
+    """Pre-rendered display strings for a StockRecord (or stock dict)"""
+    price = stock.get("current_price")
+    change = stock.get("change")
+    percent_change = stock.get("percent_change")
+    market_cap = stock.get("marketCap")
+    return StockDisplay(
+        price=format_currency(price) if price is not None else "",
+        change=f"{change:+.2f}" if change is not None else "",
+        percent_change=f"{percent_change:+.2f}%" if percent_change is not None else "",
+        market_cap=format_number(market_cap) if market_cap is not None else "",
+        change_class="positive" if (change or 0) >= 0 else "negative"
+    )
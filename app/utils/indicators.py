@@ -0,0 +1,236 @@
+"""
+Vectorized technical indicators over cached candles
+
+Every kernel takes a 2-D float array of shape (n_symbols, n_bars), right-aligned
+and NaN-padded on the left (see stack_columns), so one call covers the whole
+universe. 1-D input is treated as a single symbol. Bars without enough history
+for the window come back as NaN.
+"""
+import numpy as np
+from app.utils.cache import TTLCache
+
+
+def _as_2d(x):
+    x = np.asarray(x, dtype=np.float64)
+    return x[np.newaxis, :] if x.ndim == 1 else x
+
+
+def stack_columns(columns):
+    """Right-align 1-D series of different lengths into one NaN-padded 2-D array"""
+    width = max((len(column) for column in columns), default=0)
+    out = np.full((len(columns), width), np.nan)
+    for row, column in enumerate(columns):
+        if len(column):
+            out[row, width - len(column):] = column
+    return out
+
+
+def _rolling_sum(x, window):
+    """Rolling sum and count of non-NaN values over the last `window` bars"""
+    valid = ~np.isnan(x)
+    zero_filled = np.where(valid, x, 0.0)
+    pad = np.zeros((x.shape[0], 1))
+    csum = np.concatenate([pad, np.cumsum(zero_filled, axis=1)], axis=1)
+    ccount = np.concatenate([pad, np.cumsum(valid, axis=1)], axis=1)
+    total = np.full_like(x, np.nan)
+    count = np.zeros_like(x)
+    total[:, window - 1:] = csum[:, window:] - csum[:, :-window]
+    count[:, window - 1:] = ccount[:, window:] - ccount[:, :-window]
+    return total, count
+
+
+def sma(x, window):
+    """Simple moving average"""
+    x = _as_2d(x)
+    total, count = _rolling_sum(x, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count == window, total / window, np.nan)
+
+
+def ema(x, span=20, alpha=None):
+    """
+    Exponential moving average, seeded with each symbol's first valid value
+
+    The recursion runs over bars, but every step is one vector operation
+    across all symbols.
+    """
+    x = _as_2d(x)
+    alpha = alpha if alpha is not None else 2.0 / (span + 1)
+    out = np.full_like(x, np.nan)
+    prev = np.full(x.shape[0], np.nan)
+    for i in range(x.shape[1]):
+        current = x[:, i]
+        updated = np.where(np.isnan(prev), current, alpha * current + (1 - alpha) * prev)
+        # Padding / missing bars carry the previous value instead of resetting it
+        prev = np.where(np.isnan(current), prev, updated)
+        out[:, i] = prev
+    return out
+
+
+def rolling_std(x, window):
+    """Population standard deviation over the last `window` bars"""
+    x = _as_2d(x)
+    total, count = _rolling_sum(x, window)
+    total_sq, _ = _rolling_sum(x * x, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / window
+        variance = np.maximum(total_sq / window - mean * mean, 0.0)
+        return np.where(count == window, np.sqrt(variance), np.nan)
+
+
+def wilder_average(x, window):
+    """
+    Wilder's smoothed average, seeded with the simple mean of each symbol's
+    first `window` valid values (NaN before that); every later bar moves the
+    average 1/window of the way towards the new value
+    """
+    x = _as_2d(x)
+    out = np.full_like(x, np.nan)
+    seen = np.zeros(x.shape[0])
+    seed_total = np.zeros(x.shape[0])
+    prev = np.full(x.shape[0], np.nan)
+    for i in range(x.shape[1]):
+        current = x[:, i]
+        valid = ~np.isnan(current)
+        seen += valid
+        seed_total = np.where(valid & (seen <= window), seed_total + current, seed_total)
+        prev = np.where(valid & (seen == window), seed_total / window, prev)
+        prev = np.where(valid & (seen > window), prev + (current - prev) / window, prev)
+        out[:, i] = prev
+    return out
+
+
+def rsi(close, window=14):
+    """Relative Strength Index with Wilder smoothing (first value after `window` changes)"""
+    close = _as_2d(close)
+    delta = np.diff(close, axis=1, prepend=np.nan)
+    gains = np.where(delta > 0, delta, np.where(np.isnan(delta), np.nan, 0.0))
+    losses = np.where(delta < 0, -delta, np.where(np.isnan(delta), np.nan, 0.0))
+
+    avg_gain = wilder_average(gains, window)
+    avg_loss = wilder_average(losses, window)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rs = avg_gain / avg_loss
+        return np.where(
+            np.isnan(avg_loss), np.nan, np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + rs))
+        )
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """Returns (macd_line, signal_line, histogram)"""
+    close = _as_2d(close)
+    line = ema(close, span=fast) - ema(close, span=slow)
+    signal_line = ema(line, span=signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger_bands(close, window=20, num_std=2.0):
+    """Returns (middle, upper, lower)"""
+    middle = sma(close, window)
+    spread = num_std * rolling_std(close, window)
+    return middle, middle + spread, middle - spread
+
+
+def vwap(high, low, close, volume, window=None):
+    """
+    Volume-weighted average price of the typical price (h + l + c) / 3
+
+    Cumulative over the whole range by default, or rolling with `window`.
+    """
+    typical = (_as_2d(high) + _as_2d(low) + _as_2d(close)) / 3.0
+    volume = _as_2d(volume)
+    if window:
+        weighted, _ = _rolling_sum(typical * volume, window)
+        total_volume, _ = _rolling_sum(volume, window)
+    else:
+        weighted = np.nancumsum(typical * volume, axis=1)
+        total_volume = np.nancumsum(volume, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total_volume > 0, weighted / total_volume, np.nan)
+
+
+def rolling_volatility(close, window=20, periods_per_year=252):
+    """Annualized standard deviation of log returns"""
+    close = _as_2d(close)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = np.diff(np.log(close), axis=1, prepend=np.nan)
+    return rolling_std(returns, window) * np.sqrt(periods_per_year)
+
+
+# name -> (kernel, candle columns it needs, output names)
+INDICATORS = {
+    "sma": (sma, ("close",), ("sma",)),
+    "ema": (ema, ("close",), ("ema",)),
+    "rsi": (rsi, ("close",), ("rsi",)),
+    "macd": (macd, ("close",), ("macd", "signal", "histogram")),
+    "bollinger": (bollinger_bands, ("close",), ("middle", "upper", "lower")),
+    "vwap": (vwap, ("high", "low", "close", "volume"), ("vwap",)),
+    "volatility": (rolling_volatility, ("close",), ("volatility",)),
+}
+
+
+class IndicatorEngine:
+    """
+    Computes indicators for many symbols in one batched call
+
+    Results are memoized per (symbol, resolution, days_back, indicator, params,
+    first and last bar timestamps, bar count), so repeat requests are free
+    until the bars change; a slid or trimmed window is a different key.
+    """
+
+    def __init__(self, stock_api, maxsize=10_000):
+        self.api = stock_api
+        self._memo = TTLCache(ttl=24 * 60 * 60, maxsize=maxsize)
+
+    def compute(self, symbols, indicator, resolution="D", days_back=90, **params):
+        """
+        Args:
+            symbols: Symbols to compute for
+            indicator: Name from INDICATORS
+            params: Keyword arguments for the kernel (e.g. window=20)
+
+        Returns:
+            Dict of symbol -> {output name: 1-D array aligned with that symbol's
+            candle timestamps}; symbols without candles are omitted
+        """
+        kernel, inputs, outputs = INDICATORS[indicator]
+        param_key = tuple(sorted(params.items()))
+
+        results, pending = {}, []
+        for symbol in symbols:
+            candles = self.api.get_candle_arrays(symbol, resolution=resolution, days_back=days_back)
+            if candles is None:
+                continue
+            timestamps = candles["timestamps"]
+            key = (symbol, resolution, days_back, indicator, param_key,
+                   timestamps[0], timestamps[-1], len(timestamps))
+            cached = self._memo.get(key)
+            if cached is not None:
+                results[symbol] = cached
+            else:
+                pending.append((symbol, key, candles))
+
+        if pending:
+            columns = [stack_columns([candles[name] for _, _, candles in pending]) for name in inputs]
+            computed = kernel(*columns, **params)
+            if not isinstance(computed, tuple):
+                computed = (computed,)
+
+            for row, (symbol, key, candles) in enumerate(pending):
+                length = len(candles["timestamps"])
+                result = {
+                    name: values[row, values.shape[1] - length:]
+                    for name, values in zip(outputs, computed)
+                }
+                self._memo.set(key, result)
+                results[symbol] = result
+
+        return results
+
+
+# ==================== MODULE-LEVEL INITIALIZATION ====================
+# Imported here (not at the top) because the kernels above have no API dependency
+from app.utils.stocks_api import api  # noqa: E402
+
+indicator_engine = IndicatorEngine(api)
@@ -0,0 +1,288 @@
+import hashlib
+import json
+import queue
+import threading
+from datetime import datetime, timedelta, timezone
+import click
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from app.database import db
+from app.models.payment import IpnEvent
+
+
+# Row statuses that mean the callback has not been applied (yet)
+UNAPPLIED_STATUSES = ("pending", "processing", "failed")
+
+
+def ipn_key(payment_id, invoice_id, payment_status):
+    """Idempotency key for a callback: one application per (payment, status)"""
+    reference = payment_id or f"invoice-{invoice_id}"
+    return f"{reference}:{payment_status}"
+
+
+def ipn_payload_hash(callback_data):
+    """sha256 of the canonical (sorted, compact) JSON payload, for dropping exact repeats"""
+    canonical = json.dumps(callback_data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class IpnQueue:
+    """
+    Applies stored IPN callbacks (IpnEvent rows)
+
+    The webhook only verifies the signature, inserts the row and calls
+    enqueue(). With `workers` = 0 (the default) the handler (status update,
+    wallet credit, notification, email) runs inline right after. With workers
+    configured, a pool of worker threads runs it off the request path, so
+    NOWPayments gets its 200 in milliseconds. The table is the durable queue:
+    a sweeper thread re-enqueues pending rows every `poll_interval` seconds,
+    which also picks up rows left behind by a restart, another process, or a
+    failed attempt.
+
+    The pool is started lazily by the first enqueue(), so it lives in the
+    process that serves requests (not a gunicorn --preload master whose
+    threads die at fork), and is restarted if its threads are gone.
+
+    Rows are claimed with a conditional UPDATE, so any number of workers and
+    processes can share the table. The unique applied_key column records which
+    event applied each (payment, status); later events for the same pair only
+    update amounts. The handler locks
+    the payment row itself, so callbacks for one payment never interleave.
+
+    Usage:
+        ipn_queue.init_app(app, handler=apply_ipn_event)
+        ipn_queue.enqueue(event.id)
+    """
+
+    def __init__(self, workers=0, poll_interval=30, max_attempts=5, stuck_after=300):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.stuck_after = stuck_after  # seconds before a 'processing' row is presumed abandoned
+        self.app = None
+        self.handler = None
+        self._queue = queue.Queue()
+        self._threads = []
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self._locks = [threading.Lock() for _ in range(64)]  # striped per payment
+
+    def init_app(self, app, handler):
+        """
+        Args:
+            app: Flask app whose context workers run in
+            handler: handler(event) -> final status ('done', 'unmatched', ...) or None for 'done'
+        """
+        self.app = app
+        self.handler = handler
+
+    # ============= Producing =============
+
+    def enqueue(self, event_id):
+        """
+        Hand a committed IpnEvent to the workers (inline when there are none)
+
+        Returns:
+            "queued" when the workers own it (the sweeper retries failures),
+            otherwise the inline outcome as returned by process()
+        """
+        self.start()
+        if self.running:
+            self._queue.put(event_id)
+            return "queued"
+        return self.process(event_id)
+
+    def redeliver(self, event_id):
+        """
+        Offer a stored event again because NOWPayments resent the same callback
+
+        A failed row, or a claim abandoned for longer than stuck_after, goes
+        back to pending and is enqueued; so is a row that is still pending.
+
+        Returns:
+            What enqueue() returns ("queued" too for a row a worker is
+            applying), or the row's current status if it was already applied
+            or is being applied inline right now
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.stuck_after)
+        db.session.execute(
+            update(IpnEvent)
+            .where(
+                IpnEvent.id == event_id,
+                or_(
+                    IpnEvent.status == "failed",
+                    and_(IpnEvent.status == "processing", IpnEvent.claimed_at < cutoff)
+                )
+            )
+            .values(status="pending", applied_key=None)
+        )
+        status = db.session.scalar(select(IpnEvent.status).where(IpnEvent.id == event_id))
+        db.session.commit()
+        if status == "pending":
+            return self.enqueue(event_id)
+        if status == "processing" and self.running:
+            return "queued"  # a worker has it; the sweeper retries it if that fails
+        return status
+
+    # ============= Consuming =============
+
+    def _claim(self, event_id, reserve_key=True):
+        """
+        Mark a pending row as processing; with reserve_key, also take its
+        (payment, status) key in the same statement (IntegrityError if taken)
+        """
+        values = dict(status="processing", claimed_at=datetime.now(timezone.utc), attempts=IpnEvent.attempts + 1)
+        if reserve_key:
+            values["applied_key"] = IpnEvent.ipn_key
+        result = db.session.execute(
+            update(IpnEvent).where(IpnEvent.id == event_id, IpnEvent.status == "pending").values(**values)
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def _lock_for(self, event):
+        """
+        In-process lock for the event's payment. Only saves workers in this
+        process from queueing on the same row lock; correctness comes from the
+        handler's SELECT ... FOR UPDATE. Keyed on our order_id, which every
+        callback for a payment carries (payment_id first appears only after
+        invoice-only callbacks).
+        """
+        reference = (event.payload or {}).get("order_id") or event.invoice_id or event.payment_id
+        return self._locks[hash(reference) % len(self._locks)]
+
+    def process(self, event_id):
+        """
+        Apply one event if it is still pending
+
+        Returns:
+            The event's final status, or None if someone else had claimed it
+        """
+        with self.app.app_context():
+            reserved = True
+            try:
+                claimed = self._claim(event_id)
+            except IntegrityError:
+                # This (payment, status) was already applied by another event. A
+                # repeat can still carry new amounts (e.g. a second partially_paid),
+                # so run the handler anyway: it only fires status handlers on an
+                # actual status change, which it makes under the payment row lock
+                db.session.rollback()
+                reserved = False
+                claimed = self._claim(event_id, reserve_key=False)
+            if not claimed:
+                return None
+
+            event = db.session.get(IpnEvent, event_id)
+            with self._lock_for(event):
+                try:
+                    outcome = self.handler(event) or "done"
+                except Exception as e:
+                    db.session.rollback()
+                    return self._retry_later(event_id, e)
+
+            if not reserved and outcome == "redundant":
+                outcome = "duplicate"
+            return self._finish(event_id, outcome)
+
+    def _finish(self, event_id, status):
+        values = dict(status=status, processed_at=datetime.now(timezone.utc), last_error=None)
+        if status == "unmatched":
+            values["applied_key"] = None  # nothing was applied, so don't block a later repeat
+        db.session.execute(update(IpnEvent).where(IpnEvent.id == event_id).values(**values))
+        db.session.commit()
+        return status
+
+    def _retry_later(self, event_id, error):
+        """Release the key and put the row back (or give up after max_attempts)"""
+        event = db.session.get(IpnEvent, event_id)
+        event.applied_key = None
+        event.last_error = str(error)
+        event.status = "failed" if event.attempts >= self.max_attempts else "pending"
+        db.session.commit()
+        self.app.logger.error(
+            f"IPN event {event_id} ({event.ipn_key}) failed on attempt {event.attempts}: {error}"
+        )
+        return event.status
+
+    def pending_ids(self, limit=500):
+        """Ids of rows waiting to be applied, after releasing abandoned claims"""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.stuck_after)
+        db.session.execute(
+            update(IpnEvent)
+            .where(IpnEvent.status == "processing", IpnEvent.claimed_at < cutoff)
+            .values(status="pending", applied_key=None)
+        )
+        db.session.commit()
+        return db.session.scalars(
+            select(IpnEvent.id).where(IpnEvent.status == "pending").order_by(IpnEvent.id).limit(limit)
+        ).all()
+
+    def drain(self):
+        """Apply every pending event in this thread; returns how many were processed"""
+        with self.app.app_context():
+            event_ids = self.pending_ids()
+        return sum(1 for event_id in event_ids if self.process(event_id))
+
+    # ============= Threads =============
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                event_id = self._queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            try:
+                self.process(event_id)
+            except Exception as e:
+                # Row stays pending/processing; the sweeper will offer it again
+                print(f"IPN worker error for event {event_id}: {e}")
+
+    def _sweep(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                with self.app.app_context():
+                    for event_id in self.pending_ids():
+                        self._queue.put(event_id)
+            except Exception as e:
+                print(f"IPN sweep failed: {e}")
+
+    @property
+    def running(self):
+        """True if this process has live worker threads (threads do not survive a fork)"""
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self):
+        """Start the worker pool and sweeper (no-op if running or workers == 0)"""
+        if self.workers <= 0 or self.running:
+            return
+        with self._start_lock:
+            if self.running:
+                return
+            # Fresh queue: one inherited across a fork may hold a lock taken in the parent
+            self._queue = queue.Queue()
+            self._stop = threading.Event()
+            self._threads = [
+                threading.Thread(target=self._work, name=f"ipn-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            self._threads.append(threading.Thread(target=self._sweep, name="ipn-sweeper", daemon=True))
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+
+# Initialize queue instance (singleton pattern, configured and started from the app factory)
+ipn_queue = IpnQueue()
+
+
+@click.command("process-ipn")
+def process_ipn_command():
+    """Apply stored IPN callbacks that are still pending (for deployments without workers)"""
+    count = ipn_queue.drain()
+    click.echo(f"Processed {count} IPN callbacks")
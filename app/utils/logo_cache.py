@@ -0,0 +1,201 @@
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html import escape
+from pathlib import Path
+import requests
+from requests.adapters import HTTPAdapter
+from app.utils.sqlite_store import SQLiteStore
+
+# Served by the stocks blueprint (see app/routes/stocks.py)
+LOGO_URL_PREFIX = "/logos/"
+
+# Raster formats only: an SVG served from our own origin could carry script
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+    (b"\x00\x00\x01\x00", ".ico"),
+)
+
+LOGO_MIMETYPES = {
+    ".png": "image/png", ".jpg": "image/jpeg", ".gif": "image/gif",
+    ".webp": "image/webp", ".ico": "image/x-icon", ".svg": "image/svg+xml"
+}
+
+
+def sniff_image(data):
+    """File extension for image bytes, or None if they are not an accepted image"""
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return ".webp"
+    for signature, extension in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return extension
+    return None
+
+
+def placeholder_svg(symbol):
+    """Monogram shown for symbols whose logo could not be fetched"""
+    letters = escape((symbol or "?").split(".")[0][:4])
+    hue = int(hashlib.md5(letters.encode("utf-8")).hexdigest()[:2], 16) * 360 // 256
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg" width="64" height="64" viewBox="0 0 64 64">'
+        f'<rect width="64" height="64" rx="32" fill="hsl({hue},55%,45%)"/>'
+        '<text x="32" y="38" font-family="Arial,sans-serif" font-size="18" font-weight="bold" '
+        f'fill="#fff" text-anchor="middle">{letters}</text></svg>'
+    )
+
+
+class LogoStore(SQLiteStore):
+    """Which logo file (if any) each symbol resolved to, and when we last tried"""
+
+    def _create_schema(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS logos (
+                    symbol     TEXT PRIMARY KEY,
+                    filename   TEXT,
+                    source_url TEXT,
+                    checked_at REAL NOT NULL
+                )
+            """)
+
+    def set(self, symbol, filename, source_url=None):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO logos (symbol, filename, source_url, checked_at) VALUES (?, ?, ?, ?)",
+                (symbol, filename, source_url, time.time())
+            )
+
+    def all(self):
+        """symbol -> (filename or None, checked_at)"""
+        rows = self._connect().execute("SELECT symbol, filename, checked_at FROM logos")
+        return {symbol: (filename, checked_at) for symbol, filename, checked_at in rows}
+
+
+class LogoCache:
+    """
+    Fetch-once, validated, content-addressed logo cache
+
+    Each logo is downloaded once, checked to be a real image of sane size,
+    and saved as <sha256><ext>, so identical logos (GOOG / GOOGL) share a file
+    and a file's URL never changes meaning. Browsers get it from our own
+    origin with an immutable year-long Cache-Control; symbols whose logo is
+    broken get a generated monogram instead and are retried after
+    `retry_after` seconds.
+
+    Usage:
+        logos.resolve_many({'AAPL': ['https://.../AAPL.png', 'https://logo.clearbit.com/apple.com']})
+        logos.url('AAPL')   # '/logos/3f2a....png'
+    """
+
+    def __init__(self, directory, store, max_bytes=512 * 1024, retry_after=7 * 24 * 60 * 60,
+                 timeout=(3.05, 5), max_workers=8):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.store = store
+        self.max_bytes = max_bytes
+        self.retry_after = retry_after
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=max_workers))
+        self._resolved = None  # symbol -> (filename, checked_at), loaded on first use
+        self._lock = threading.Lock()
+
+    def _known(self):
+        if self._resolved is None:
+            self._resolved = self.store.all()
+        return self._resolved
+
+    # ============= Lookups =============
+
+    def url(self, symbol):
+        """
+        Local URL for a symbol's logo, the monogram if its logo is known to be
+        broken, or None if it has not been resolved yet
+        """
+        entry = self._known().get(symbol)
+        if entry is None:
+            return None
+        filename, _ = entry
+        if filename:
+            return f"{LOGO_URL_PREFIX}{filename}"
+        return f"{LOGO_URL_PREFIX}placeholder/{symbol}.svg"
+
+    def path(self, filename):
+        """Absolute path of a cached logo file, or None if we do not have it"""
+        path = self.directory / os.path.basename(filename)
+        return path if path.suffix in LOGO_MIMETYPES and path.is_file() else None
+
+    def needs_resolve(self, symbol):
+        entry = self._known().get(symbol)
+        if entry is None:
+            return True
+        filename, checked_at = entry
+        if filename:
+            return not (self.directory / filename).is_file()
+        return time.time() - checked_at > self.retry_after
+
+    # ============= Fetching =============
+
+    def _download(self, url):
+        """Fetch and validate one candidate URL; returns the stored filename or None"""
+        try:
+            with self.session.get(url, timeout=self.timeout, stream=True) as response:
+                if response.status_code != 200:
+                    return None
+                data = response.raw.read(self.max_bytes + 1, decode_content=True)
+        except requests.exceptions.RequestException:
+            return None
+
+        # Tracking-pixel sized or oversized responses are not logos
+        if len(data) < 64 or len(data) > self.max_bytes:
+            return None
+        extension = sniff_image(data)
+        if extension is None:
+            return None
+
+        filename = hashlib.sha256(data).hexdigest() + extension
+        path = self.directory / filename
+        if not path.exists():
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        return filename
+
+    def resolve(self, symbol, candidates, force=False):
+        """
+        Make sure a symbol's logo is cached, trying candidate URLs in order
+
+        Returns:
+            The symbol's local logo URL
+        """
+        if force or self.needs_resolve(symbol):
+            filename, source = None, None
+            for candidate in dict.fromkeys(c for c in candidates if c):
+                filename = self._download(candidate)
+                if filename:
+                    source = candidate
+                    break
+            self.store.set(symbol, filename, source)
+            with self._lock:
+                self._known()[symbol] = (filename, time.time())
+        return self.url(symbol)
+
+    def resolve_many(self, candidates_by_symbol, force=False):
+        """Resolve many symbols in parallel; returns symbol -> local logo URL"""
+        pending = {
+            symbol: candidates for symbol, candidates in candidates_by_symbol.items()
+            if force or self.needs_resolve(symbol)
+        }
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                for symbol, candidates in pending.items():
+                    pool.submit(self.resolve, symbol, candidates, force)
+        return {symbol: self.url(symbol) for symbol in candidates_by_symbol}
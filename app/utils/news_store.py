@@ -0,0 +1,133 @@
+import hashlib
+import time
+from app.utils.sqlite_store import SQLiteStore
+
+ARTICLE_FIELDS = ("headline", "summary", "source", "url", "image", "datetime", "category")
+
+
+def url_hash(url):
+    """Stable dedup key for an article (the same story is listed under many symbols)"""
+    return hashlib.sha1((url or "").encode("utf-8")).hexdigest()
+
+
+class NewsStore(SQLiteStore):
+    """
+    Local, deduplicated index of company news
+
+    Articles are stored once, keyed by URL hash, with a separate symbol link
+    table, so the same story tagged on AAPL and MSFT is kept once. A per-symbol
+    cursor remembers the newest article seen and when we last asked Finnhub,
+    so ingestion only fetches what is new and feed reads never go upstream.
+    """
+
+    def _create_schema(self):
+        conn = self._connect()
+        with conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    url_hash TEXT PRIMARY KEY,
+                    url      TEXT,
+                    headline TEXT,
+                    summary  TEXT,
+                    source   TEXT,
+                    image    TEXT,
+                    category TEXT,
+                    datetime INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS idx_articles_datetime ON articles (datetime DESC);
+
+                CREATE TABLE IF NOT EXISTS article_symbols (
+                    symbol   TEXT NOT NULL,
+                    url_hash TEXT NOT NULL,
+                    datetime INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (symbol, url_hash)
+                );
+                CREATE INDEX IF NOT EXISTS idx_article_symbols_latest
+                    ON article_symbols (symbol, datetime DESC);
+
+                CREATE TABLE IF NOT EXISTS news_cursors (
+                    symbol        TEXT PRIMARY KEY,
+                    last_datetime INTEGER,
+                    fetched_at    REAL NOT NULL
+                );
+            """)
+
+    def add_articles(self, symbol, articles):
+        """
+        Store raw Finnhub articles for a symbol, skipping ones we already have
+
+        Returns:
+            Number of articles that were new to the index
+        """
+        rows, links = [], []
+        for article in articles:
+            if not article.get("url"):
+                continue
+            key = url_hash(article["url"])
+            published = int(article.get("datetime") or 0)
+            rows.append((
+                key, article["url"], article.get("headline"), article.get("summary"),
+                article.get("source"), article.get("image"), article.get("category"), published
+            ))
+            links.append((symbol, key, published))
+
+        conn = self._connect()
+        with conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO articles "
+                "(url_hash, url, headline, summary, source, image, category, datetime) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            inserted = conn.total_changes - before
+            conn.executemany(
+                "INSERT OR IGNORE INTO article_symbols (symbol, url_hash, datetime) VALUES (?, ?, ?)",
+                links
+            )
+        return inserted
+
+    def get_cursor(self, symbol):
+        """(last_datetime, fetched_at) for a symbol, or None if never ingested"""
+        return self._connect().execute(
+            "SELECT last_datetime, fetched_at FROM news_cursors WHERE symbol = ?", (symbol,)
+        ).fetchone()
+
+    def update_cursor(self, symbol, fetched_at=None):
+        """Record an ingestion run; last_datetime is the newest article we hold"""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO news_cursors (symbol, last_datetime, fetched_at) "
+                "VALUES (?, (SELECT MAX(datetime) FROM article_symbols WHERE symbol = ?), ?)",
+                (symbol, symbol, fetched_at or time.time())
+            )
+
+    def latest(self, symbols, limit=10, since=None):
+        """
+        Latest articles across one or many symbols, newest first, each story once
+
+        Args:
+            symbols: A symbol or list of symbols (e.g. a user's watchlist)
+            limit: Maximum number of articles
+            since: Only articles published at or after this epoch second
+        """
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        symbols = list(symbols)
+        if not symbols:
+            return []
+
+        placeholders = ",".join("?" * len(symbols))
+        query = (
+            f"SELECT {', '.join(ARTICLE_FIELDS)} FROM articles WHERE url_hash IN "
+            f"(SELECT url_hash FROM article_symbols WHERE symbol IN ({placeholders}))"
+        )
+        params = symbols
+        if since is not None:
+            query += " AND datetime >= ?"
+            params = params + [since]
+        query += " ORDER BY datetime DESC LIMIT ?"
+
+        rows = self._connect().execute(query, params + [limit]).fetchall()
+        return [dict(zip(ARTICLE_FIELDS, row)) for row in rows]
@@ -1,10 +1,13 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import hmac
 import hashlib
 import json
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 from flask import current_app
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
 
 
 class NOWPaymentsService:
@@ -16,23 +19,87 @@ class NOWPaymentsService:
     BASE_URL = "https://api.nowpayments.io/v1"
     SANDBOX_URL = "https://api-sandbox.nowpayments.io/v1"
 
-    def __init__(self, api_key: str, ipn_secret: str = None, sandbox: bool = False):
+    def __init__(
+            self,
+            api_key: str,
+            ipn_secret: str = None,
+            sandbox: bool = False,
+            pool_size: int = 10,
+            connect_timeout: float = 3.05,
+            read_timeout: float = 10,
+            retries: int = 2,
+            backoff_factor: float = 0.3,
+            breaker: CircuitBreaker = None
+    ):
         """
         Initialize NOWPayments service
 
+        Built once per process by the app factory (see get_nowpayments_service),
+        so every request shares the same pooled keep-alive connections.
+
         Args:
             api_key: Your NOWPayments API key
             ipn_secret: IPN callback secret for webhook verification
             sandbox: Use sandbox environment for testing
+            pool_size: Max keep-alive connections to the API (one per concurrent worker thread)
+            connect_timeout: Seconds to wait for a connection
+            read_timeout: Seconds to wait for each response read
+            retries: Retries for GET requests on connection errors and 429/5xx responses
+            backoff_factor: Base of the jittered exponential backoff between retries
+            breaker: Circuit breaker shared by all calls (defaults to 5 failures / 30s)
         """
         self.api_key = api_key
         self.ipn_secret = ipn_secret
         self.base_url = self.SANDBOX_URL if sandbox else self.BASE_URL
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = breaker or CircuitBreaker("NOWPayments API")
         self.session = requests.Session()
         self.session.headers.update({
             "x-api-key": self.api_key,
             "Content-Type": "application/json"
         })
+        # Only idempotent GETs are retried: a repeated POST could create a second payment
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=self._retry_policy(retries, backoff_factor)
+        ))
+
+    @classmethod
+    def from_config(cls, config) -> "NOWPaymentsService":
+        """Build the service from the NOWPAYMENTS_* settings of a Flask app config"""
+        return cls(
+            api_key=config["NOWPAYMENTS_API_KEY"],
+            ipn_secret=config["NOWPAYMENTS_IPN_SECRET"],
+            sandbox=config.get("NOWPAYMENTS_SANDBOX", False),
+            pool_size=config.get("NOWPAYMENTS_POOL_SIZE", 10),
+            connect_timeout=config.get("NOWPAYMENTS_CONNECT_TIMEOUT", 3.05),
+            read_timeout=config.get("NOWPAYMENTS_READ_TIMEOUT", 10),
+            retries=config.get("NOWPAYMENTS_RETRIES", 2),
+            breaker=CircuitBreaker(
+                "NOWPayments API",
+                failure_threshold=config.get("NOWPAYMENTS_BREAKER_FAILURES", 5),
+                reset_timeout=config.get("NOWPAYMENTS_BREAKER_RESET", 30)
+            )
+        )
+
+    @staticmethod
+    def _retry_policy(retries: int, backoff_factor: float) -> Retry:
+        """urllib3 retry policy: GETs only, capped jittered backoff, honours Retry-After"""
+        options = dict(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            backoff_factor=backoff_factor,
+            raise_on_status=False
+        )
+        try:
+            return Retry(backoff_jitter=backoff_factor, backoff_max=5, **options)
+        except TypeError:  # urllib3 < 2.0 has no jitter/max options
+            return Retry(**options)
 
     def _make_request(self, method: str, endpoint: str, data: Dict = None) -> Dict:
         """
@@ -51,14 +118,27 @@ class NOWPaymentsService:
         """
         url = f"{self.base_url}/{endpoint}"
 
+        # Fail fast while NOWPayments is down instead of tying up a worker per request
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError as e:
+            raise Exception(f"NOWPayments API is temporarily unavailable ({e}). Please try again shortly.")
+
         try:
             if method.upper() == "GET":
-                response = self.session.get(url, params=data)
+                response = self.session.get(url, params=data, timeout=self.timeout)
             elif method.upper() == "POST":
-                response = self.session.post(url, json=data)
+                response = self.session.post(url, json=data, timeout=self.timeout)
             else:
+                self.breaker.record_success()  # our mistake, not an outage
                 raise ValueError(f"Unsupported HTTP method: {method}")
 
+            # Server errors count towards an outage; client errors (bad pair, bad key) do not
+            if response.status_code >= 500 or response.status_code == 429:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+
             response.raise_for_status()
             return response.json()
 
@@ -74,12 +154,22 @@ class NOWPaymentsService:
                 error_msg += f" — {e.response.text}"
             raise Exception(error_msg)
 
+        except ValueError as e:
+            # Unsupported method or a non-JSON body (requests' JSONDecodeError is a ValueError)
+            raise Exception(f"Request failed: {str(e)}")
+
         except requests.exceptions.ConnectionError:
+            self.breaker.record_failure()
             raise Exception("Could not connect to NOWPayments API. Check your internet connection.")
 
         except requests.exceptions.Timeout:
+            self.breaker.record_failure()
             raise Exception("NOWPayments API request timed out. Please try again.")
 
+        except requests.exceptions.RequestException as e:
+            self.breaker.record_failure()
+            raise Exception(f"Request failed: {str(e)}")
+
         except Exception as e:
             raise Exception(f"Request failed: {str(e)}")
 
@@ -470,6 +560,42 @@ class PaymentStatus:
     COMPLETED_STATUSES = {FINISHED, CONFIRMED}
     PENDING_STATUSES = {WAITING, CONFIRMING, SENDING}
     FAILED_STATUSES = {FAILED, EXPIRED, REFUNDED}
+    # Statuses a payment only reaches once it has been confirmed (sending is
+    # NOWPayments forwarding the confirmed funds to us)
+    SETTLED_STATUSES = {CONFIRMED, SENDING, FINISHED}
+
+    # Lifecycle order. NOWPayments retries IPNs and may deliver them out of
+    # order, so a callback may only move a payment to a higher rank; the
+    # final outcomes share a rank so one can never replace another (except
+    # a refund, which can follow any of them). An underpayment is spotted
+    # while confirming, so partially_paid sits just above confirming: a top-up
+    # can still take it to confirmed / finished, but it can never follow them.
+    RANK = {
+        WAITING: 0,
+        CONFIRMING: 1,
+        PARTIALLY_PAID: 2,
+        CONFIRMED: 3,
+        SENDING: 4,
+        FINISHED: 5,
+        FAILED: 5,
+        EXPIRED: 5,
+        REFUNDED: 6,
+    }
+
+    @classmethod
+    def is_advance(cls, old_status: Optional[str], new_status: Optional[str]) -> bool:
+        """
+        True if moving from old_status to new_status goes forward in the lifecycle
+
+        Unknown statuses are let through, so a status NOWPayments adds later is
+        not silently dropped.
+        """
+        if old_status == new_status or not new_status:
+            return False
+        old_rank, new_rank = cls.RANK.get(old_status), cls.RANK.get(new_status)
+        if old_rank is None or new_rank is None:
+            return True
+        return new_rank > old_rank
 
 
 class InvoiceStatus:
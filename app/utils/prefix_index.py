@@ -0,0 +1,106 @@
+import re
+import threading
+from bisect import bisect_left, insort
+
+_TOKEN_SPLIT = re.compile(r"[^0-9a-z.]+")
+
+
+def tokenize(text):
+    """Lower-cased search terms in a string ('Coca-Cola Co' -> ['coca', 'cola', 'co'])"""
+    if not text:
+        return []
+    return [token for token in _TOKEN_SPLIT.split(str(text).lower()) if token]
+
+
+class PrefixIndex:
+    """
+    Sorted term list for prefix lookups (autocomplete)
+
+    Terms are kept in one sorted list of (term, field, key) tuples, so every
+    term starting with a prefix is a contiguous slice found with two binary
+    searches: O(log n) to locate, independent of how many keys are indexed.
+    That is the lookup a trie gives, at a fraction of the memory for the few
+    thousand keys we index. Keys can be added and removed one at a time, so an
+    index can follow a changing data set without a full rebuild.
+
+    `field` is a small integer the caller uses to tell term kinds apart
+    (e.g. 0 = ticker, 1 = company name) when ranking matches.
+    """
+
+    def __init__(self):
+        self._entries = []  # sorted (term, field, key)
+        self._terms = {}  # key -> entries added for it
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._terms)
+
+    def __contains__(self, key):
+        return key in self._terms
+
+    def add(self, key, terms):
+        """
+        Index a key under (field, text) pairs, replacing what it had before
+
+        Args:
+            key: Any hashable, orderable id (e.g. the ticker)
+            terms: Iterable of (field, text); text is tokenized into words and
+                also indexed whole, so 'brk.b' and 'berkshire hathaway' both match
+        """
+        entries = self._entries_for(key, terms)
+        with self._lock:
+            self._remove(key)
+            for entry in entries:
+                insort(self._entries, entry)
+            self._terms[key] = entries
+
+    def add_many(self, items):
+        """Bulk add of (key, terms) pairs with one sort instead of one insert per term"""
+        with self._lock:
+            for key, terms in items:
+                self._remove(key)
+                entries = self._terms[key] = self._entries_for(key, terms)
+                self._entries.extend(entries)
+            self._entries.sort()
+
+    @staticmethod
+    def _entries_for(key, terms):
+        entries = set()
+        for field, text in terms:
+            if not text:
+                continue
+            whole = str(text).lower()
+            entries.add((whole, field, key))
+            entries.update((token, field, key) for token in tokenize(whole))
+        return entries
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        for entry in self._terms.pop(key, ()):
+            i = bisect_left(self._entries, entry)
+            if i < len(self._entries) and self._entries[i] == entry:
+                del self._entries[i]
+
+    def matches(self, prefix, limit=None):
+        """
+        (term, field, key) for every term starting with prefix, in term order
+
+        A key can match more than once (several of its words share the prefix).
+        """
+        prefix = prefix.lower()
+        if not prefix:
+            return []
+
+        found = []
+        with self._lock:
+            entries = self._entries
+            i = bisect_left(entries, (prefix,))
+            while i < len(entries) and entries[i][0].startswith(prefix):
+                found.append(entries[i])
+                if limit and len(found) >= limit:
+                    break
+                i += 1
+        return found
@@ -0,0 +1,206 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+
+
+class LastTradeTable:
+    """
+    Array-backed last-trade table keyed by symbol
+
+    Each symbol owns one row in a set of parallel NumPy arrays; a dict maps
+    symbol -> row, so reads and writes are O(1) and the whole table can be
+    scanned as columns. Arrays double in size when they fill up.
+    """
+
+    def __init__(self, capacity=256):
+        self._index = {}  # symbol -> row
+        self.symbols = []
+        self.price = np.full(capacity, np.nan)
+        self.last_volume = np.zeros(capacity)
+        self.volume = np.zeros(capacity)  # cumulative volume since the feed started
+        self.timestamp = np.zeros(capacity)  # epoch seconds of the last trade
+        self._lock = threading.Lock()
+
+    def _row(self, symbol):
+        row = self._index.get(symbol)
+        if row is None:
+            row = len(self.symbols)
+            if row == len(self.price):
+                self._grow()
+            self._index[symbol] = row
+            self.symbols.append(symbol)
+        return row
+
+    def _grow(self):
+        size = len(self.price) * 2
+        self.price = np.concatenate([self.price, np.full(size - len(self.price), np.nan)])
+        for name in ("last_volume", "volume", "timestamp"):
+            column = getattr(self, name)
+            setattr(self, name, np.concatenate([column, np.zeros(size - len(column))]))
+
+    def update(self, symbol, price, volume, timestamp):
+        with self._lock:
+            row = self._row(symbol)
+            # Trades can arrive slightly out of order; keep the newest price
+            if timestamp >= self.timestamp[row]:
+                self.price[row] = price
+                self.timestamp[row] = timestamp
+            self.last_volume[row] = volume
+            self.volume[row] += volume
+
+    def get(self, symbol):
+        """Last trade for a symbol as a dict, or None if we have not seen one"""
+        row = self._index.get(symbol)
+        if row is None:
+            return None
+        return {
+            'symbol': symbol,
+            'price': float(self.price[row]),
+            'last_volume': float(self.last_volume[row]),
+            'volume': float(self.volume[row]),
+            'timestamp': float(self.timestamp[row])
+        }
+
+    def __contains__(self, symbol):
+        return symbol in self._index
+
+
+class QuoteFeed:
+    """
+    Streaming quotes from Finnhub's trade WebSocket
+
+    A background thread keeps one connection open (reconnecting with backoff),
+    writes every trade into a LastTradeTable and fans it out to listeners.
+    Point `url` at benchmarks/finnhub_ws_stub.py to run without Finnhub.
+
+    Usage:
+        quote_feed.subscribe(['AAPL', 'MSFT'])
+        quote_feed.add_listener(lambda trade: ...)
+        quote_feed.start()
+        quote_feed.get('AAPL')  # {'price': ..., 'volume': ..., 'timestamp': ...}
+    """
+
+    def __init__(self, api_key, url="wss://ws.finnhub.io", table=None):
+        self.api_key = api_key
+        self.url = url
+        self.table = table or LastTradeTable()
+        self._symbols = set()
+        self._listeners = []
+        self._ws = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    # ============= Subscription API =============
+
+    def subscribe(self, symbols):
+        with self._lock:
+            new = [symbol for symbol in symbols if symbol not in self._symbols]
+            self._symbols.update(new)
+        for symbol in new:
+            self._send({'type': 'subscribe', 'symbol': symbol})
+
+    def unsubscribe(self, symbols):
+        with self._lock:
+            removed = [symbol for symbol in symbols if symbol in self._symbols]
+            self._symbols.difference_update(removed)
+        for symbol in removed:
+            self._send({'type': 'unsubscribe', 'symbol': symbol})
+
+    def add_listener(self, callback):
+        """Call callback(trade_dict) for every trade (runs on the feed thread)"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def get(self, symbol):
+        """O(1) read of the last trade for a symbol"""
+        return self.table.get(symbol)
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    # ============= Connection =============
+
+    def start(self):
+        """Start the background connection thread (no-op if already running)"""
+        if self.is_running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="quote-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._ws:
+            self._ws.close()
+
+    def _run(self):
+        import websocket  # only needed when streaming is enabled
+
+        backoff = 1
+        while not self._stop.is_set():
+            self._ws = websocket.WebSocketApp(
+                f"{self.url}?token={self.api_key}",
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=lambda ws, error: print(f"Quote feed error: {error}")
+            )
+            started = time.monotonic()
+            self._ws.run_forever(ping_interval=30, ping_timeout=10)
+            self._ws = None
+
+            if self._stop.is_set():
+                break
+            # Reset the backoff after a connection that stayed up for a while
+            backoff = 1 if time.monotonic() - started > 60 else min(backoff * 2, 60)
+            print(f"Quote feed disconnected, reconnecting in {backoff}s...")
+            self._stop.wait(backoff)
+
+    def _send(self, message):
+        ws = self._ws
+        if ws is not None and ws.sock and ws.sock.connected:
+            ws.send(json.dumps(message))
+
+    def _on_open(self, ws):
+        with self._lock:
+            symbols = list(self._symbols)
+        for symbol in symbols:
+            ws.send(json.dumps({'type': 'subscribe', 'symbol': symbol}))
+
+    def _on_message(self, ws, message):
+        try:
+            payload = json.loads(message)
+        except json.JSONDecodeError:
+            return
+        if payload.get('type') != 'trade':
+            return  # pings and errors
+
+        for trade in payload.get('data') or []:
+            symbol = trade.get('s')
+            price = trade.get('p')
+            if not symbol or price is None:
+                continue
+            # Finnhub sends milliseconds
+            self.table.update(symbol, price, trade.get('v') or 0, (trade.get('t') or 0) / 1000)
+
+            if self._listeners:
+                latest = self.table.get(symbol)
+                for listener in list(self._listeners):
+                    try:
+                        listener(latest)
+                    except Exception as e:
+                        print(f"Quote feed listener failed: {e}")
+
+
+# ==================== MODULE-LEVEL INITIALIZATION ====================
+# Started from the app factory when FINNHUB_WEBSOCKET=true
+quote_feed = QuoteFeed(
+    api_key=os.environ.get('FINNHUB_API_KEY'),
+    url=os.environ.get('FINNHUB_WS_URL', 'wss://ws.finnhub.io')
+)
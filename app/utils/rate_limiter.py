@@ -0,0 +1,187 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter interface
+
+    Tokens refill continuously at `rate` per second up to `capacity` (the burst
+    size). Every upstream request spends one token.
+
+    Backends only implement `try_acquire` and `penalize`; blocking behaviour is
+    shared so callers get the same semantics whichever backend is configured.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate  # tokens added per second
+        self.capacity = capacity  # maximum burst size
+
+    def try_acquire(self, tokens=1):
+        """
+        Take tokens without blocking
+
+        Returns:
+            0.0 if the tokens were taken, otherwise the number of seconds until
+            enough tokens will be available (nothing is consumed in that case)
+        """
+        raise NotImplementedError
+
+    def penalize(self, seconds):
+        """Empty the bucket so nobody gets a token for `seconds` (e.g. after a 429)"""
+        raise NotImplementedError
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Block until tokens are available
+
+        Returns:
+            True once the tokens were taken, False if `timeout` seconds passed first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return True
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+
+            time.sleep(wait)
+
+
+class LocalTokenBucket(TokenBucket):
+    """Thread-safe bucket shared by every thread in the current process"""
+
+    def __init__(self, rate, capacity):
+        super().__init__(rate, capacity)
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, tokens=1):
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+    def penalize(self, seconds):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class RedisTokenBucket(TokenBucket):
+    """
+    Bucket stored in Redis so every gunicorn worker (and host) shares one budget
+
+    The refill-and-take step runs as a Lua script, so it is atomic across
+    processes, and it uses the Redis server clock so workers never disagree
+    about elapsed time. If Redis errors or times out, calls fall back to a
+    per-process bucket and Redis is not tried again for `cooldown` seconds, so
+    an outage costs one socket timeout per cooldown rather than one per call,
+    and never fails the request.
+    """
+
+    # KEYS[1] = bucket key
+    # ARGV = rate, capacity, requested tokens (0 to just read), penalty seconds
+    SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local capacity = tonumber(ARGV[2])
+    local requested = tonumber(ARGV[3])
+    local penalty = tonumber(ARGV[4])
+
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+    local wait = 0
+    if penalty > 0 then
+        tokens = math.min(tokens, -penalty * rate)
+    elseif tokens >= requested then
+        tokens = tokens - requested
+    else
+        wait = (requested - tokens) / rate
+    end
+
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate + penalty) + 60)
+    return tostring(wait)
+    """
+
+    def __init__(self, client, key, rate, capacity, cooldown=30):
+        from redis import RedisError
+
+        super().__init__(rate, capacity)
+        self.client = client
+        self.key = key
+        self._script = client.register_script(self.SCRIPT)
+        self._errors = RedisError
+        self.fallback = LocalTokenBucket(rate, capacity)
+        self.cooldown = cooldown
+        self._degraded = False
+        self._retry_at = 0.0  # monotonic time before which Redis is skipped
+
+    def _run(self, tokens, penalty):
+        """Run the script; None if Redis failed or is cooling down (logged once per outage)"""
+        if self._degraded and time.monotonic() < self._retry_at:
+            return None
+
+        try:
+            result = self._script(keys=[self.key], args=[self.rate, self.capacity, tokens, penalty])
+        except self._errors as e:
+            self._retry_at = time.monotonic() + self.cooldown
+            if not self._degraded:
+                self._degraded = True
+                print(f"Redis rate limiter failed ({e}), using in-process limiter, retrying Redis every {self.cooldown}s")
+            return None
+
+        if self._degraded:
+            self._degraded = False
+            print("Redis rate limiter recovered")
+        return result
+
+    def try_acquire(self, tokens=1):
+        result = self._run(tokens, 0)
+        if result is None:
+            return self.fallback.try_acquire(tokens)
+        return float(result)
+
+    def penalize(self, seconds):
+        # Always penalize locally too, so a 429 is honoured even if Redis drops out
+        self.fallback.penalize(seconds)
+        self._run(0, seconds)
+
+
+def create_rate_limiter(rate, capacity, redis_url=None, key="ratelimit:default"):
+    """
+    Build the best available bucket for this deployment
+
+    With a redis_url all worker processes share one budget; without one (or if
+    Redis is unreachable) we fall back to a per-process bucket.
+    """
+    if redis_url:
+        try:
+            import redis
+
+            client = redis.Redis.from_url(redis_url, socket_timeout=2, socket_connect_timeout=2)
+            client.ping()
+            return RedisTokenBucket(client, key, rate, capacity)
+        except Exception as e:
+            print(f"Redis rate limiter unavailable ({e}), using in-process limiter")
+
+    return LocalTokenBucket(rate, capacity)
@@ -0,0 +1,42 @@
+import os
+import sqlite3
+import threading
+
+
+class SQLiteStore:
+    """
+    Base class for the local SQLite caches under app/cache
+
+    Each thread gets its own connection (sqlite3 connections cannot be shared
+    across threads) and the database runs in WAL mode, so readers never block
+    on a writer and always see the last committed transaction.
+    Subclasses create their tables in `_create_schema`.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+        self._create_schema()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def file_signature(self):
+        """(mtime, size) of the database and its WAL file; changes on every commit"""
+        signature = []
+        for suffix in ("", "-wal"):
+            try:
+                stat = os.stat(self.path + suffix)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _create_schema(self):
+        raise NotImplementedError
@@ -0,0 +1,87 @@
+import heapq
+import threading
+from collections import namedtuple
+from operator import attrgetter
+from app.utils.stock_records import StockRecord
+
+# key: record field to rank by
+# largest: True keeps the highest values, False the lowest
+# default: value used when the field is missing (None skips the stock)
+Ranking = namedtuple("Ranking", ["key", "largest", "default"])
+
+RANKINGS = {
+    "trending": Ranking("marketCap", largest=True, default=0),
+    "gainers": Ranking("percent_change", largest=True, default=None),
+    "losers": Ranking("percent_change", largest=False, default=None),
+}
+
+DEFAULT_CATEGORIES = ("trending", "gainers", "losers")
+
+
+def rank_stocks(stocks, k=10, categories=DEFAULT_CATEGORIES):
+    """
+    Compute the top-k of several rankings in a single pass
+
+    Each category keeps a bounded min-heap of k entries, so the cost is
+    O(n log k) per category instead of a full O(n log n) sort. Ties keep the
+    input order, matching what a stable sort would return.
+
+    Returns:
+        Dict of category name -> list of up to k stocks, best first
+    """
+    rankings = [(name, RANKINGS[name], attrgetter(RANKINGS[name].key)) for name in categories]
+    heaps = {name: [] for name, _, _ in rankings}
+
+    for position, stock in enumerate(stocks):
+        # StockRecord fields are slots: a C-level attribute read beats .get()
+        is_record = type(stock) is StockRecord
+        for name, ranking, read in rankings:
+            value = read(stock) if is_record else stock.get(ranking.key)
+            if value is None:
+                if ranking.default is None:
+                    continue
+                value = ranking.default
+
+            # Heap entries compare on (score, -position): the min-heap root is
+            # always the weakest entry, and later stocks lose ties
+            score = value if ranking.largest else -value
+            entry = (score, -position, stock)
+            heap = heaps[name]
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, entry)
+
+    return {
+        name: [stock for _, _, stock in sorted(heap, key=lambda entry: entry[:2], reverse=True)]
+        for name, heap in heaps.items()
+    }
+
+
+class RankingCache:
+    """
+    Memoizes rank_stocks results per snapshot version
+
+    Rankings only change when the stocks cache is rewritten, so every request
+    against the same snapshot reuses one result.
+    """
+
+    def __init__(self):
+        self._version = None
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def get(self, version, stocks, k=10, categories=DEFAULT_CATEGORIES, scope=None):
+        key = (scope, k, tuple(categories))
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                self._results = {}
+            result = self._results.get(key)
+
+        if result is None:
+            result = rank_stocks(stocks, k=k, categories=categories)
+            with self._lock:
+                if version == self._version:
+                    self._results[key] = result
+        return result
@@ -0,0 +1,157 @@
+import json
+from app.utils.formatting import stock_display
+
+# Field order is also the on-disk order of the compact JSON encoding, so only
+# ever append to it (rows written with fewer fields decode with None padding)
+STOCK_FIELDS = (
+    "symbol", "name", "logo", "exchange", "industry", "marketCap", "country",
+    "currency", "weburl", "current_price", "change", "percent_change", "high",
+    "low", "open", "previous_close", "timestamp", "volume"
+)
+
+# /quote and /stock/profile2 response keys for each record field
+QUOTE_KEYS = {
+    "current_price": "c", "change": "d", "percent_change": "dp", "high": "h",
+    "low": "l", "open": "o", "previous_close": "pc", "timestamp": "t",
+    "volume": "v"  # only present when streaming
+}
+PROFILE_KEYS = {
+    "name": "name", "exchange": "exchange", "industry": "finnhubIndustry",
+    "marketCap": "marketCapitalization", "country": "country",
+    "currency": "currency", "weburl": "weburl"
+}
+
+
+class StockRecord:
+    """
+    Compact, read-only stock record (quote + profile for one symbol)
+
+    Uses __slots__ instead of a per-instance dict, so a record is a fraction
+    of the size of the equivalent 18-key dict and field reads are plain
+    attribute lookups. It still quacks like a read-only mapping (record['symbol'],
+    record.get('marketCap'), {**record}), so existing callers and the Jinja
+    templates (stock.name) work unchanged.
+    """
+
+    __slots__ = STOCK_FIELDS + ("_display",)
+
+    def __init__(self, *values, **fields):
+        # Member descriptors bypass the read-only __setattr__ below
+        _set_display(self, None)
+        for setter, value in zip(_SETTERS, values):
+            setter(self, value)
+        for setter in _SETTERS[len(values):]:
+            setter(self, None)
+        for name, value in fields.items():
+            _SETTERS[_INDEX[name]](self, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("StockRecord is read-only")
+
+    __delattr__ = __setattr__
+
+    # ============= Constructors & codecs =============
+
+    @classmethod
+    def from_finnhub(cls, symbol, quote, profile, logo=None):
+        """Build a record from raw /quote and /stock/profile2 responses"""
+        record = cls(symbol=symbol, logo=logo or profile.get("logo"))
+        for field, key in PROFILE_KEYS.items():
+            _SETTERS[_INDEX[field]](record, profile.get(key))
+        for field, key in QUOTE_KEYS.items():
+            _SETTERS[_INDEX[field]](record, quote.get(key))
+        return record
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{field: data[field] for field in STOCK_FIELDS if field in data})
+
+    @classmethod
+    def from_json(cls, text):
+        """Decode to_json output (also accepts the older one-object-per-stock format)"""
+        data = json.loads(text)
+        if isinstance(data, dict):
+            return cls.from_dict(data)
+        return cls(*data)
+
+    def to_json(self):
+        """Compact positional encoding: a JSON array in STOCK_FIELDS order"""
+        return json.dumps(self.values(), separators=(",", ":"))
+
+    def to_dict(self):
+        return dict(zip(STOCK_FIELDS, self.values()))
+
+    def replace(self, **changes):
+        """Copy of the record with some fields changed"""
+        record = StockRecord(*self.values())
+        for name, value in changes.items():
+            _SETTERS[_INDEX[name]](record, value)
+        return record
+
+    @property
+    def display(self):
+        """
+        Pre-rendered display strings (see app/utils/formatting.py)
+
+        Built on first access and kept with the record, so every render of the
+        same cached stock reuses the same strings.
+        """
+        display = self._display
+        if display is None:
+            display = stock_display(self)
+            _set_display(self, display)
+        return display
+
+    # ============= Read-only mapping interface =============
+
+    def values(self):
+        return [getter(self) for getter in _GETTERS]
+
+    def keys(self):
+        return STOCK_FIELDS
+
+    def items(self):
+        return zip(STOCK_FIELDS, self.values())
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in _INDEX else default
+
+    def __getitem__(self, key):
+        if key not in _INDEX:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in _INDEX
+
+    def __iter__(self):
+        return iter(STOCK_FIELDS)
+
+    def __len__(self):
+        return len(STOCK_FIELDS)
+
+    def __eq__(self, other):
+        if isinstance(other, StockRecord):
+            return self.values() == other.values()
+        if isinstance(other, dict):
+            return self.to_dict() == {field: other.get(field) for field in STOCK_FIELDS}
+        return NotImplemented
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return (StockRecord, tuple(self.values()))
+
+    def __repr__(self):
+        return f"<StockRecord {self.symbol} {self.current_price}>"
+
+
+_INDEX = {field: i for i, field in enumerate(STOCK_FIELDS)}
+_SETTERS = [StockRecord.__dict__[field].__set__ for field in STOCK_FIELDS]
+_GETTERS = [StockRecord.__dict__[field].__get__ for field in STOCK_FIELDS]
+_set_display = StockRecord.__dict__["_display"].__set__
+
+
+def as_record(stock):
+    """Accept a StockRecord or a plain stock dict"""
+    return stock if isinstance(stock, StockRecord) else StockRecord.from_dict(stock)
@@ -0,0 +1,128 @@
+import os
+import threading
+import click
+from app.utils.stocks_api import api
+
+
+def _try_lock(lock_file):
+    """Take an exclusive lock on an open file without blocking; False if another process has it"""
+    try:
+        import fcntl
+    except ImportError:
+        # Windows has no fcntl: lock the first byte with msvcrt instead
+        import msvcrt
+        try:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+def _unlock(lock_file):
+    try:
+        import fcntl
+    except ImportError:
+        import msvcrt
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        return
+    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class StockRefresher:
+    """
+    Keeps the on-disk stock cache warm from a background thread
+
+    Symbols are refetched once they reach `refresh_ahead` of their max age, so
+    request paths (which only ever read the snapshot) never see an expired
+    cache. A file lock makes sure only one process refreshes at a time when
+    several gunicorn workers each run a refresher.
+    """
+
+    def __init__(self, stock_api, limit=50, max_age_hours=24, refresh_ahead=0.8, interval=60):
+        self.api = stock_api
+        self.limit = limit
+        self.max_age_hours = max_age_hours
+        self.refresh_ahead = refresh_ahead  # fraction of max age at which we refetch
+        self.interval = interval  # seconds between staleness checks
+        self._thread = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+    def run_once(self):
+        """
+        Refresh every symbol that is close to expiry
+
+        Returns:
+            Number of symbols refetched (0 if fresh or another process holds the lock)
+        """
+        lock_path = self.api._get_cache_path('stocks_refresh.lock')
+        with open(lock_path, 'w') as lock_file:
+            if not _try_lock(lock_file):
+                return 0  # another worker is already refreshing
+
+            try:
+                refresh_age_hours = self.max_age_hours * self.refresh_ahead
+                symbols = self.api.get_major_stocks_list(limit=self.limit)
+                stale = self.api._get_store().stale_symbols(symbols, max_age=refresh_age_hours * 3600)
+                if stale:
+                    self.api.cache_major_stocks(limit=self.limit, max_age_hours=refresh_age_hours)
+                return len(stale)
+            finally:
+                _unlock(lock_file)
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                # Keep serving the last good snapshot and try again next tick
+                print(f"Background stock refresh failed: {e}")
+
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def start(self):
+        """Start the background thread (no-op if already running)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="stock-refresher", daemon=True)
+        self._thread.start()
+
+    def trigger(self):
+        """Wake the background thread to check for stale symbols now"""
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+
+# Initialize refresher instance (singleton pattern, started from the app factory)
+# STOCKS_UNIVERSE_SIZE: how many of the most popular symbols to keep cached
+refresher = StockRefresher(api, limit=int(os.environ.get("STOCKS_UNIVERSE_SIZE", 50)))
+
+
+@click.command("refresh-stocks")
+@click.option("--loop", is_flag=True, help="Keep running and refresh ahead of expiry.")
+@click.option("--interval", default=60, show_default=True, help="Seconds between checks with --loop.")
+def refresh_stocks_command(loop, interval):
+    """Refresh the stocks cache (standalone worker entry point)"""
+    if not loop:
+        count = refresher.run_once()
+        click.echo(f"Refreshed {count} stocks")
+        return
+
+    refresher.interval = interval
+    click.echo(f"Refreshing stocks every {interval}s (Ctrl+C to stop)")
+    try:
+        refresher.run_forever()
+    except KeyboardInterrupt:
+        refresher.stop()
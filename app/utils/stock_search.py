@@ -0,0 +1,89 @@
+import heapq
+import threading
+from app.utils.prefix_index import PrefixIndex
+
+# Indexed fields, in ranking order (a ticker match beats a name match, etc.)
+TICKER, NAME, INDUSTRY = 0, 1, 2
+
+RESULT_FIELDS = ("symbol", "name", "logo", "exchange", "industry", "current_price", "percent_change")
+
+
+def _terms(stock):
+    return ((TICKER, stock.symbol), (NAME, stock.name), (INDUSTRY, stock.industry))
+
+
+class StockSearchIndex:
+    """
+    Prefix search over the cached stocks (ticker, company name, industry)
+
+    Follows the stock cache snapshot: when its version changes only the
+    symbols that were added, removed, or had a searchable field change are
+    re-indexed, so a quote-only refresh costs a field comparison per stock.
+    Results are memoized per snapshot version, since typeahead traffic is
+    dominated by the same short prefixes.
+    """
+
+    def __init__(self, max_memo=1024):
+        self.index = PrefixIndex()
+        self.max_memo = max_memo
+        self._version = None
+        self._stocks = {}  # symbol -> StockRecord currently indexed
+        self._memo = {}  # (query, limit) -> results for the current version
+        self._lock = threading.Lock()
+
+    def refresh(self, snapshot):
+        """Bring the index up to date with a StockSnapshot (no-op if unchanged)"""
+        if snapshot.version == self._version:
+            return
+        with self._lock:
+            if snapshot.version == self._version:
+                return
+            current = snapshot.by_symbol
+            for symbol in self._stocks.keys() - current.keys():
+                self.index.remove(symbol)
+            changed = [
+                (symbol, _terms(stock)) for symbol, stock in current.items()
+                if symbol not in self._stocks or _terms(self._stocks[symbol]) != _terms(stock)
+            ]
+            if len(changed) > 100:
+                self.index.add_many(changed)
+            else:
+                for symbol, terms in changed:
+                    self.index.add(symbol, terms)
+            self._stocks = dict(current)
+            self._memo = {}
+            self._version = snapshot.version
+
+    def search(self, query, limit=10):
+        """
+        Best matches for a typeahead query
+
+        Ranking: exact ticker, ticker prefix, company name word, then industry;
+        ties go to the larger company.
+
+        Returns:
+            List of StockRecords
+        """
+        query = (query or "").strip().lower()
+        if not query:
+            return []
+        memo, stocks = self._memo, self._stocks
+        results = memo.get((query, limit))
+        if results is not None:
+            return results
+
+        best = {}  # symbol -> 0 exact ticker, 1 ticker prefix, 2 name, 3 industry
+        for term, field, symbol in self.index.matches(query):
+            score = 0 if field == TICKER and term == query else 1 + field
+            if score < best.get(symbol, 4) and symbol in stocks:
+                best[symbol] = score
+
+        def sort_key(item):
+            symbol, score = item
+            return score, -(stocks[symbol].marketCap or 0), symbol
+
+        results = [stocks[symbol] for symbol, _ in heapq.nsmallest(limit, best.items(), key=sort_key)]
+        if len(memo) >= self.max_memo:
+            memo.clear()
+        memo[(query, limit)] = results
+        return results
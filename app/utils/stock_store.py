@@ -0,0 +1,163 @@
+import threading
+import time
+from types import MappingProxyType
+from app.utils.sqlite_store import SQLiteStore
+from app.utils.stock_records import StockRecord, as_record
+
+
+class StockSnapshot:
+    """
+    Immutable, already-parsed view of the stock cache at one point in time
+
+    Records are read-only StockRecords, so one snapshot can be handed to every
+    request in the process without copying. Their display strings are
+    rendered here, once per snapshot, instead of in every template render.
+    """
+
+    __slots__ = ("version", "stocks", "by_symbol", "updated_at")
+
+    def __init__(self, version, rows):
+        self.version = version  # file signature the snapshot was loaded from
+        self.stocks = tuple(StockRecord.from_json(data) for _, data, _ in rows)
+        for stock in self.stocks:
+            stock.display  # render display strings now, not on first page view
+        self.by_symbol = MappingProxyType({stock.symbol: stock for stock in self.stocks})
+        self.updated_at = MappingProxyType({symbol: updated_at for symbol, _, updated_at in rows})
+
+    def oldest_update(self, symbols=None):
+        """Epoch seconds of the oldest cached symbol (None if any is missing)"""
+        if symbols is None:
+            symbols = self.updated_at.keys()
+        try:
+            return min((self.updated_at[symbol] for symbol in symbols), default=None)
+        except KeyError:
+            return None
+
+
+class StockCacheStore(SQLiteStore):
+    """
+    SQLite-backed on-disk stock cache with one row per symbol
+
+    Every write is a single transaction (see SQLiteStore for connection and
+    WAL handling), so readers never see a half-written cache.
+    Rows carry their own fetch timestamp, which lets a refresh update only the
+    symbols that went stale and lets readers load just the symbols they need.
+    """
+
+    def __init__(self, path):
+        self._snapshot = None
+        self._snapshot_lock = threading.Lock()
+        super().__init__(path)
+
+    def _create_schema(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS stocks (
+                    symbol     TEXT PRIMARY KEY,
+                    position   INTEGER NOT NULL DEFAULT 0,
+                    data       TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_stocks_position ON stocks (position)")
+
+    def upsert_many(self, stocks, positions=None, updated_at=None):
+        """
+        Insert or replace stocks in one atomic transaction
+
+        Args:
+            stocks: StockRecords or stock dicts (must contain 'symbol')
+            positions: Optional symbol -> sort position (e.g. index in the universe)
+            updated_at: Epoch seconds to record, defaults to now
+        """
+        updated_at = updated_at or time.time()
+        positions = positions or {}
+        records = [as_record(stock) for stock in stocks]
+        rows = [
+            (record.symbol, positions.get(record.symbol, 0), record.to_json(), updated_at)
+            for record in records
+        ]
+
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO stocks (symbol, position, data, updated_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def get(self, symbols, max_age=None):
+        """
+        Load only the requested symbols
+
+        Returns:
+            Dict of symbol -> StockRecord for symbols that are cached (and younger than
+            max_age seconds, if given)
+        """
+        symbols = list(symbols)
+        if not symbols:
+            return {}
+
+        placeholders = ",".join("?" * len(symbols))
+        query = f"SELECT symbol, data FROM stocks WHERE symbol IN ({placeholders})"
+        params = symbols
+        if max_age is not None:
+            query += " AND updated_at >= ?"
+            params = symbols + [time.time() - max_age]
+
+        rows = self._connect().execute(query, params).fetchall()
+        return {symbol: StockRecord.from_json(data) for symbol, data in rows}
+
+    def get_all(self, max_age=None):
+        """Load every cached stock in position order"""
+        query = "SELECT data FROM stocks"
+        params = []
+        if max_age is not None:
+            query += " WHERE updated_at >= ?"
+            params.append(time.time() - max_age)
+        query += " ORDER BY position, symbol"
+
+        return [StockRecord.from_json(data) for (data,) in self._connect().execute(query, params)]
+
+    def stale_symbols(self, symbols, max_age):
+        """Return the symbols that are missing or older than max_age seconds"""
+        fresh = {
+            symbol for (symbol,) in self._connect().execute(
+                "SELECT symbol FROM stocks WHERE updated_at >= ?",
+                (time.time() - max_age,)
+            )
+        }
+        return [symbol for symbol in symbols if symbol not in fresh]
+
+    def updated_range(self):
+        """Return (oldest, newest) fetch timestamps, or (None, None) when empty"""
+        return self._connect().execute(
+            "SELECT MIN(updated_at), MAX(updated_at) FROM stocks"
+        ).fetchone()
+
+    def count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM stocks").fetchone()[0]
+
+    def snapshot(self):
+        """
+        Return the memoized snapshot, reloading only when the file changed
+
+        The steady-state cost is two stat() calls: no query, no JSON parsing.
+        """
+        signature = self.file_signature()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == signature:
+            return snapshot
+
+        with self._snapshot_lock:
+            # Another thread may have reloaded while we waited for the lock
+            signature = self.file_signature()
+            if self._snapshot is None or self._snapshot.version != signature:
+                # Signature is taken before reading, so a concurrent write can
+                # only cause one extra reload, never a missed one
+                rows = self._connect().execute(
+                    "SELECT symbol, data, updated_at FROM stocks ORDER BY position, symbol"
+                ).fetchall()
+                self._snapshot = StockSnapshot(signature, rows)
+            return self._snapshot
@@ -1,82 +1,92 @@
 import requests
+from requests.adapters import HTTPAdapter
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-import json
 from pathlib import Path
 import os
-
-
-def format_number(num):
-    try:
-        num = float(num)
-        if num >= 1_000_000_000_000:
-            return f"{num/1_000_000_000_000:.1f}T"
-        elif num >= 1_000_000_000:
-            return f"{num/1_000_000_000:.1f}B"
-        elif num >= 1_000_000:
-            return f"{num/1_000_000:.1f}M"
-        elif num >= 1_000:
-            return f"{num/1_000:.1f}K"
-        else:
-            return f"{num:.2f}"
-    except:
-        return num  # fallback for non-numeric input
+import numpy as np
+from app.utils.cache import SingleFlight, TTLCache
+from app.utils.candle_store import (
+    CANDLE_FIELDS, RESOLUTION_SECONDS, CandleStore, candles_to_block, validate_candle_key
+)
+from app.utils.logo_cache import LogoCache, LogoStore
+from app.utils.news_store import NewsStore
+from app.utils.rate_limiter import LocalTokenBucket, create_rate_limiter
+from app.utils.stock_rankings import DEFAULT_CATEGORIES, RankingCache, rank_stocks
+from app.utils.stock_records import StockRecord
+from app.utils.stock_search import RESULT_FIELDS as SEARCH_RESULT_FIELDS, StockSearchIndex
+from app.utils.stock_store import StockCacheStore
+from app.utils.symbol_universe import SymbolUniverse, SymbolUniverseStore
 
 
 class FinnhubStockAPI:
-    def __init__(self, api_key):
+    def __init__(self, api_key, rate_limiter=None, max_workers=8,
+                 profile_ttl=24 * 60 * 60, quote_ttl=15,
+                 pool_size=None, connect_timeout=3.05, read_timeout=10):
         self.api_key = api_key
         self.base_url = "https://finnhub.io/api/v1"
-        self.last_request_time = 0
-        self.min_request_interval = 1.1  # ~55 requests/min to stay safe
-
-        # Logo domain mapping (Clearbit fallback)
-        self.logo_domains = {
-            'AAPL': 'apple.com', 'MSFT': 'microsoft.com',
-            'GOOGL': 'google.com', 'GOOG': 'google.com',
-            'AMZN': 'amazon.com', 'NVDA': 'nvidia.com',
-            'META': 'meta.com', 'TSLA': 'tesla.com',
-            'BRK.B': 'berkshirehathaway.com', 'JPM': 'jpmorganchase.com',
-            'V': 'visa.com', 'WMT': 'walmart.com', 'MA': 'mastercard.com',
-            'UNH': 'unitedhealthgroup.com', 'JNJ': 'jnj.com',
-            'XOM': 'exxonmobil.com', 'PG': 'pg.com', 'HD': 'homedepot.com',
-            'CVX': 'chevron.com', 'ABBV': 'abbvie.com', 'LLY': 'lilly.com',
-            'MRK': 'merck.com', 'KO': 'coca-cola.com', 'PEP': 'pepsi.com',
-            'COST': 'costco.com', 'AVGO': 'broadcom.com', 'TMO': 'thermofisher.com',
-            'ADBE': 'adobe.com', 'ACN': 'accenture.com', 'CSCO': 'cisco.com',
-            'DIS': 'disney.com', 'NKE': 'nike.com', 'NFLX': 'netflix.com',
-            'CRM': 'salesforce.com', 'INTC': 'intel.com', 'AMD': 'amd.com',
-            'QCOM': 'qualcomm.com', 'TXN': 'ti.com', 'ORCL': 'oracle.com',
-            'IBM': 'ibm.com', 'PYPL': 'paypal.com', 'BA': 'boeing.com',
-            'GE': 'ge.com', 'CAT': 'caterpillar.com', 'UPS': 'ups.com',
-            'GS': 'goldmansachs.com', 'MS': 'morganstanley.com',
-            'AXP': 'americanexpress.com', 'BLK': 'blackrock.com',
-            'SBUX': 'starbucks.com', 'MCD': 'mcdonalds.com',
-        }
+        # ~55 requests/min (+ a small burst) keeps us under the free-tier 60/min
+        self.rate_limiter = rate_limiter or LocalTokenBucket(rate=55 / 60, capacity=5)
+        self.max_workers = max_workers
+
+        # One pooled keep-alive session, so calls reuse TCP+TLS connections.
+        # The pool must be at least as large as the fetch thread pool.
+        self.pool_size = pool_size or max_workers
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size))
+        self.session.headers.update({"Accept-Encoding": "gzip, deflate"})
+
+        # Company profiles (name, logo, exchange, industry) almost never change,
+        # quotes change every second, so each endpoint gets its own TTL
+        self.profile_cache = TTLCache(ttl=profile_ttl)
+        self.quote_cache = TTLCache(ttl=quote_ttl)
+        self._stores = {}  # cache filename -> StockCacheStore
+        self._rankings = RankingCache()
+        self._search = StockSearchIndex()
+        self._candle_store = None
+        self._no_candles = TTLCache(ttl=15 * 60, maxsize=10_000)  # (symbol, resolution) -> True
+        self._news_store = None
+        self._universe = None
+        self._logos = None
+        self._inflight = SingleFlight()
+
+        # Optional streaming feed (see app/utils/quote_feed.py); attached by the app factory
+        self.quote_feed = None
+        self.live_base_quote_ttl = 6 * 60 * 60  # open/previous close only change daily
 
     def _rate_limit(self):
         """Ensure we don't exceed rate limits"""
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.min_request_interval:
-            time.sleep(self.min_request_interval - elapsed)
-        self.last_request_time = time.time()
+        self.rate_limiter.acquire()
 
     def _get(self, endpoint, params=None, retries=3):
-        """Make API request with rate limiting and retries"""
-        if params is None:
-            params = {}
+        """
+        Make API request with rate limiting and retries
+
+        Concurrent callers asking for the same (endpoint, params) share one
+        in-flight request, so a burst of users on one ticker costs one call.
+        """
+        params = dict(params or {})
+        key = (endpoint, tuple(sorted(params.items())))
+        return self._inflight.do(key, self._fetch, endpoint, params, retries)
+
+    def _fetch(self, endpoint, params, retries=3):
+        """Send one request (no coalescing); see _get"""
         params['token'] = self.api_key
 
         for attempt in range(retries):
             try:
                 self._rate_limit()  # Enforce rate limit before request
 
-                response = requests.get(f"{self.base_url}{endpoint}", params=params)
+                response = self.session.get(f"{self.base_url}{endpoint}", params=params, timeout=self.timeout)
 
                 if response.status_code == 429:  # Rate limited
-                    wait_time = 60  # Wait 1 minute
-                    print(f"Rate limited. Waiting {wait_time}s...")
-                    time.sleep(wait_time)
+                    # Drain the shared bucket instead of sleeping here, so every
+                    # thread and worker backs off together for the same window
+                    wait_time = float(response.headers.get('Retry-After', 60))
+                    print(f"Rate limited. Pausing all Finnhub calls for {wait_time}s...")
+                    self.rate_limiter.penalize(wait_time)
                     continue
 
                 response.raise_for_status()
@@ -90,213 +100,473 @@ class FinnhubStockAPI:
 
         return None
 
-    def get_major_stocks_list(self, limit=50):
-        """Get top 50 most popular stocks"""
-        return [
-                   'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA', 'META', 'TSLA', 'BRK.B',
-                   'JPM', 'V', 'WMT', 'MA', 'UNH', 'JNJ', 'XOM', 'PG', 'HD', 'CVX',
-                   'ABBV', 'LLY', 'MRK', 'KO', 'PEP', 'COST', 'AVGO', 'TMO',
-                   'ADBE', 'ACN', 'CSCO', 'DIS', 'NKE', 'NFLX', 'CRM', 'INTC',
-                   'AMD', 'QCOM', 'TXN', 'ORCL', 'IBM', 'PYPL', 'BA', 'GE',
-                   'CAT', 'UPS', 'GS', 'MS', 'AXP', 'BLK', 'SBUX', 'MCD'
-               ][:limit]
-
-    def get_stock_details(self, symbol):
-        """Get all details for a single stock"""
-        # Get quote
-        quote = self._get('/quote', {'symbol': symbol})
-        if not quote:
-            return None
+    @property
+    def logos(self):
+        """Local logo cache (opened on first use)"""
+        if self._logos is None:
+            self._logos = LogoCache(self._get_cache_path('logos'), LogoStore(self._get_cache_path('logos.sqlite3')))
+        return self._logos
+
+    @property
+    def universe(self):
+        """Symbol universe (seeded with the most popular US stocks, opened on first use)"""
+        if self._universe is None:
+            self._universe = SymbolUniverse(SymbolUniverseStore(self._get_cache_path('symbols.sqlite3')))
+        return self._universe
 
-        # Get profile
-        profile = self._get('/stock/profile2', {'symbol': symbol})
-        if not profile:
+    def get_major_stocks_list(self, limit=50):
+        """Get the `limit` most popular tracked stocks (see `flask load-symbols`)"""
+        return self.universe.symbols(limit=limit)
+
+    def _cached_get(self, cache, endpoint, symbol, max_age=None):
+        """Return a cached per-symbol response, fetching it only when too old"""
+        value = cache.get(symbol, max_age=max_age)
+        if value is None:
+            value = self._get(endpoint, {'symbol': symbol})
+            if value:
+                cache.set(symbol, value)
+        return value
+
+    def get_quote(self, symbol, max_age=None):
+        """
+        Get a quote, reusing one fetched within max_age seconds (default: quote TTL)
+
+        When the streaming feed has seen a trade for the symbol, the live price
+        is laid over the last REST quote instead of polling /quote again; the
+        REST quote is then only needed for the day's open and previous close.
+        """
+        trade = self.quote_feed.get(symbol) if self.quote_feed and self.quote_feed.is_running else None
+        if trade is None:
+            return self._cached_get(self.quote_cache, '/quote', symbol, max_age)
+
+        base = self._cached_get(self.quote_cache, '/quote', symbol, max_age=self.live_base_quote_ttl)
+        return self._overlay_trade(base, trade) if base else None
+
+    @staticmethod
+    def _overlay_trade(quote, trade):
+        """Update a /quote dict with the latest streamed trade"""
+        price = trade['price']
+        previous_close = quote.get('pc')
+        live = dict(quote)
+        live['c'] = price
+        live['h'] = max(quote.get('h') or price, price)
+        live['l'] = min(quote.get('l') or price, price)
+        live['t'] = int(trade['timestamp'])
+        live['v'] = trade['volume']
+        if previous_close:
+            live['d'] = price - previous_close
+            live['dp'] = (price - previous_close) / previous_close * 100
+        return live
+
+    def get_profile(self, symbol, max_age=None):
+        """Get a company profile, reusing one fetched within max_age seconds (default: profile TTL)"""
+        return self._cached_get(self.profile_cache, '/stock/profile2', symbol, max_age)
+
+    def get_stock_details(self, symbol, max_quote_age=None, max_profile_age=None):
+        """
+        Get all details for a single stock
+
+        Quote and profile are cached separately; whichever is missing or older
+        than its max age is fetched, in parallel when both are needed.
+        Pass max_quote_age=0 to force a fresh quote while reusing the profile.
+        """
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            quote = pool.submit(self.get_quote, symbol, max_quote_age)
+            profile = pool.submit(self.get_profile, symbol, max_profile_age)
+            return self._build_stock_details(symbol, quote.result(), profile.result())
+
+    def _build_stock_details(self, symbol, quote, profile):
+        """Merge a /quote and a /stock/profile2 response into one StockRecord"""
+        if not quote or not profile:
             return None
 
-        # Use Finnhub logo if available, otherwise Clearbit
-        logo = profile.get('logo')
-        if not logo:
-            domain = self.logo_domains.get(symbol, f"{symbol.lower()}.com")
-            logo = f"https://logo.clearbit.com/{domain}"
+        # Our cached copy once resolved (see localize_logos), else Finnhub's, else Clearbit
+        logo = self.logos.url(symbol) or profile.get('logo') or self._clearbit_logo(symbol)
+        return StockRecord.from_finnhub(symbol, quote, profile, logo=logo)
+
+    def _clearbit_logo(self, symbol):
+        return f"https://logo.clearbit.com/{self.universe.logo_domain(symbol)}"
+
+    def localize_logos(self, stocks):
+        """
+        Cache the logos of freshly fetched stocks and point their records at the
+        local copies, so rendering them needs no third-party requests
+        """
+        candidates = {}
+        for stock in stocks:
+            profile = self.profile_cache.get(stock.symbol) or {}
+            candidates[stock.symbol] = [profile.get('logo'), self._clearbit_logo(stock.symbol)]
+
+        urls = self.logos.resolve_many(candidates)
+        return [stock.replace(logo=urls[stock.symbol]) if urls.get(stock.symbol) else stock for stock in stocks]
+
+    def get_multiple_stocks(self, symbols, max_workers=None, max_quote_age=None, max_profile_age=None):
+        """
+        Get details for multiple stocks CONCURRENTLY
+
+        Every /quote and /stock/profile2 call is submitted to one bounded thread
+        pool. The shared token bucket still paces the requests, so a full refresh
+        finishes as fast as the Finnhub quota allows instead of at serial latency.
+        Cached profiles are reused, so a quote-only refresh costs one call per stock.
+        """
+        total = len(symbols)
+        max_workers = max_workers or self.max_workers
+
+        print(f"Fetching {total} stocks ({max_workers} workers)...")
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            # Submit quote and profile for the same symbol back to back so
+            # stocks complete in order instead of all quotes finishing first
+            futures = {}
+            for symbol in symbols:
+                futures[symbol] = (
+                    pool.submit(self.get_quote, symbol, max_quote_age),
+                    pool.submit(self.get_profile, symbol, max_profile_age)
+                )
+
+            results = {}
+            for i, symbol in enumerate(symbols, 1):
+                quote, profile = futures[symbol]
+                result = self._build_stock_details(symbol, quote.result(), profile.result())
+                if result:
+                    results[symbol] = result
+                    print(f"[{i}/{total}] {symbol}... ✓")
+                else:
+                    print(f"[{i}/{total}] {symbol}... ✗")
 
-        return {
+        print(f"Successfully fetched {len(results)}/{total} stocks")
+        # Preserve the caller's symbol order
+        return [results[symbol] for symbol in symbols if symbol in results]
+
+    @property
+    def candle_store(self):
+        """On-disk columnar candle store (opened on first use)"""
+        if self._candle_store is None:
+            self._candle_store = CandleStore(self._get_cache_path('candles'))
+        return self._candle_store
+
+    def _fetch_candle_range(self, symbol, resolution, start, end):
+        """Fetch one time range from Finnhub and merge it into the candle store"""
+        candles = self._get('/stock/candle', {
             'symbol': symbol,
-            'name': profile.get('name'),
-            'logo': logo,
-            'exchange': profile.get('exchange'),
-            'industry': profile.get('finnhubIndustry'),
-            'marketCap': profile.get('marketCapitalization'),
-            'country': profile.get('country'),
-            'currency': profile.get('currency'),
-            'weburl': profile.get('weburl'),
-            'current_price': quote.get('c'),
-            'change': quote.get('d'),
-            'percent_change': quote.get('dp'),
-            'high': quote.get('h'),
-            'low': quote.get('l'),
-            'open': quote.get('o'),
-            'previous_close': quote.get('pc'),
-            'timestamp': quote.get('t')
-        }
-
-    def get_multiple_stocks(self, symbols):
-        """Get details for multiple stocks SEQUENTIALLY"""
-        results = []
-        total = len(symbols)
+            'resolution': resolution,
+            'from': start,
+            'to': end
+        })
 
-        print(f"Fetching {total} stocks...")
+        if candles is None:
+            return  # request failed; leave coverage alone so we retry next time
 
-        for i, symbol in enumerate(symbols, 1):
-            print(f"[{i}/{total}] {symbol}...", end=' ')
-            result = self.get_stock_details(symbol)
-            if result:
-                results.append(result)
-                print("✓")
-            else:
-                print("✗")
+        block = candles_to_block(candles) if candles.get('s') == 'ok' else candles_to_block({})
+        if not block.shape[1] and self.candle_store.coverage(symbol, resolution) is None:
+            # Nothing to store for a symbol we have no file for (unknown ticker,
+            # or no bars yet): remember that in memory instead of creating files
+            self._no_candles.set((symbol, resolution), True)
+            return
 
-        print(f"Successfully fetched {len(results)}/{total} stocks")
-        return results
+        # For a stored symbol an empty range (weekend, holiday) still extends
+        # coverage, so we never re-ask for it
+        self.candle_store.merge(symbol, resolution, block, start, end)
 
-    def get_candles(self, symbol, resolution='D', days_back=30):
-        """Get historical chart data"""
+    def get_candle_arrays(self, symbol, resolution='D', days_back=30):
+        """
+        Get historical chart data as NumPy column views
+
+        Only the parts of the range that were never fetched are requested from
+        Finnhub: a missing head, and the tail since the last stored bar (at
+        most once per bar length, capped at 5 minutes, since the last bar may
+        still be forming). Everything else is a slice of the memory-mapped store.
+
+        Returns:
+            Dict of column name -> 1-D array, or None if there is no data
+
+        Raises:
+            ValueError: Invalid symbol or unknown resolution
+        """
+        validate_candle_key(symbol, resolution)
         to_timestamp = int(time.time())
         from_timestamp = to_timestamp - (days_back * 24 * 60 * 60)
+        bar_seconds = RESOLUTION_SECONDS.get(resolution, 86400)
 
-        candles = self._get('/stock/candle', {
-            'symbol': symbol,
-            'resolution': resolution,
-            'from': from_timestamp,
-            'to': to_timestamp
-        })
-
-        if not candles or candles.get('s') == 'no_data':
+        coverage = self.candle_store.coverage(symbol, resolution)
+        if coverage is None:
+            if self._no_candles.get((symbol, resolution)):
+                return None
+            self._fetch_candle_range(symbol, resolution, from_timestamp, to_timestamp)
+        else:
+            covered_from, covered_to = coverage
+            if from_timestamp < covered_from:
+                self._fetch_candle_range(symbol, resolution, from_timestamp, covered_from)
+            if to_timestamp - covered_to >= min(bar_seconds, 300):
+                stored = self.candle_store.load(symbol, resolution)
+                tail_start = int(min(covered_to, stored[0][-1])) if stored.shape[1] else covered_to
+                self._fetch_candle_range(symbol, resolution, tail_start, to_timestamp)
+
+        bars = self.candle_store.slice(symbol, resolution, from_timestamp, to_timestamp)
+        if not bars.shape[1]:
             return None
 
-        return {
-            'timestamps': candles.get('t', []),
-            'open': candles.get('o', []),
-            'high': candles.get('h', []),
-            'low': candles.get('l', []),
-            'close': candles.get('c', []),
-            'volume': candles.get('v', [])
-        }
-
-    def get_company_news(self, symbol, days_back=7):
-        """Get news with images, titles, authors, dates"""
-        to_date = datetime.now().strftime('%Y-%m-%d')
-        from_date = (datetime.now() - timedelta(days=days_back)).strftime('%Y-%m-%d')
-
-        news = self._get('/company-news', {
-            'symbol': symbol,
-            'from': from_date,
-            'to': to_date
-        })
+        return dict(zip(CANDLE_FIELDS, bars))
 
-        if not news:
-            return []
+    def get_candles(self, symbol, resolution='D', days_back=30):
+        """Get historical chart data"""
+        arrays = self.get_candle_arrays(symbol, resolution=resolution, days_back=days_back)
+        if arrays is None:
+            return None
 
-        return [{
-            'headline': article.get('headline'),
-            'summary': article.get('summary'),
-            'source': article.get('source'),
-            'url': article.get('url'),
-            'image': article.get('image'),
-            'datetime': article.get('datetime'),
-            'category': article.get('category')
-        } for article in news[:10]]
+        candles = {field: column.tolist() for field, column in arrays.items()}
+        candles['timestamps'] = arrays['timestamps'].astype(np.int64).tolist()
+        return candles
+
+    @property
+    def news_store(self):
+        """Local deduplicated news index (opened on first use)"""
+        if self._news_store is None:
+            self._news_store = NewsStore(self._get_cache_path('news_cache.sqlite3'))
+        return self._news_store
+
+    def ingest_company_news(self, symbol, days_back=7, window_days=7, min_interval=15 * 60):
+        """
+        Pull new articles for a symbol into the local news index
+
+        Starts from the newest article already stored (or days_back on the
+        first run) and walks forward in window_days pages, storing each page
+        as it arrives. A failed page stops the run without moving the cursor
+        past it. Skipped entirely if the symbol was ingested < min_interval ago.
+
+        Returns:
+            Number of new articles stored
+        """
+        cursor = self.news_store.get_cursor(symbol)
+        if cursor and time.time() - cursor[1] < min_interval:
+            return 0
+
+        today = datetime.now().date()
+        start = today - timedelta(days=days_back)
+        if cursor and cursor[0]:
+            # Finnhub filters by date, so re-ask for the cursor's day; dedup drops repeats
+            start = max(start, datetime.fromtimestamp(cursor[0]).date())
+
+        inserted = 0
+        while start <= today:
+            end = min(start + timedelta(days=window_days), today)
+            news = self._get('/company-news', {
+                'symbol': symbol,
+                'from': start.strftime('%Y-%m-%d'),
+                'to': end.strftime('%Y-%m-%d')
+            })
+            if news is None:
+                break
+            inserted += self.news_store.add_articles(symbol, news)
+            start = end + timedelta(days=1)
+        else:
+            self.news_store.update_cursor(symbol)
 
-    def get_complete_stock_data(self, symbol):
-        """Get EVERYTHING for one stock"""
-        details = self.get_stock_details(symbol)
-        if not details:
-            return None
+        return inserted
 
-        candles = self.get_candles(symbol, days_back=30)
-        news = self.get_company_news(symbol, days_back=7)
+    def get_company_news(self, symbol, days_back=7, limit=10):
+        """Get news with images, titles, authors, dates (served from the local index)"""
+        self.ingest_company_news(symbol, days_back=days_back)
+        since = int(time.time()) - days_back * 24 * 60 * 60
+        return self.news_store.latest(symbol, limit=limit, since=since)
 
-        return {
-            **details,
-            'chart': candles,
-            'news': news
-        }
+    def get_news_feed(self, symbols, limit=20, days_back=7):
+        """Latest news across many symbols (e.g. a watchlist); never calls Finnhub"""
+        since = int(time.time()) - days_back * 24 * 60 * 60
+        return self.news_store.latest(symbols, limit=limit, since=since)
 
-    def _get_cache_path(self, filename='stocks_cache.json'):
+    def get_complete_stock_data(self, symbol):
+        """Get EVERYTHING for one stock"""
+        return self.get_complete_stock_data_many([symbol]).get(symbol)
+
+    def get_complete_stock_data_many(self, symbols, candle_days=30, news_days=7, max_workers=None):
+        """
+        Get EVERYTHING for many stocks, fanning out the independent sub-requests
+
+        Quote, profile, candles and news for every symbol are submitted to one
+        bounded pool; identical in-flight requests are coalesced in _get.
+
+        Returns:
+            Dict of symbol -> complete data (symbols without a quote/profile are omitted)
+        """
+        with ThreadPoolExecutor(max_workers=max_workers or self.max_workers) as pool:
+            futures = {
+                symbol: (
+                    pool.submit(self.get_quote, symbol),
+                    pool.submit(self.get_profile, symbol),
+                    pool.submit(self.get_candles, symbol, days_back=candle_days),
+                    pool.submit(self.get_company_news, symbol, days_back=news_days)
+                )
+                for symbol in symbols
+            }
+
+            results = {}
+            for symbol, (quote, profile, candles, news) in futures.items():
+                details = self._build_stock_details(symbol, quote.result(), profile.result())
+                if details:
+                    try:
+                        chart = candles.result()
+                    except ValueError:
+                        chart = None  # not a ticker the candle store accepts
+                    results[symbol] = {
+                        **details.to_dict(),
+                        'chart': chart,
+                        'news': news.result()
+                    }
+            return results
+
+    def _get_cache_path(self, filename='stocks_cache.sqlite3'):
         """Get cache file path"""
         cache_dir = Path(__file__).parent.parent / 'cache'
         cache_dir.mkdir(exist_ok=True)
         return cache_dir / filename
 
-    def cache_major_stocks(self, filename='stocks_cache.json', limit=50):
-        """Cache stocks to file"""
-        cache_file = self._get_cache_path(filename)
-
-        print(f"Fetching and caching {limit} major stocks...")
+    def _get_store(self, filename='stocks_cache.sqlite3'):
+        """Get (and open once) the on-disk stock store for a cache file"""
+        store = self._stores.get(filename)
+        if store is None:
+            store = self._stores[filename] = StockCacheStore(self._get_cache_path(filename))
+        return store
+
+    def cache_major_stocks(self, filename='stocks_cache.sqlite3', limit=50, max_age_hours=None):
+        """
+        Refresh the on-disk stock cache
+
+        With max_age_hours set, only symbols that are missing or older than that
+        are refetched; otherwise the whole list is refreshed. Each symbol is
+        written with its own timestamp in one atomic transaction.
+        """
+        store = self._get_store(filename)
         symbols = self.get_major_stocks_list(limit=limit)
-        stocks = self.get_multiple_stocks(symbols)
-
-        cache_data = {
-            'timestamp': datetime.now().isoformat(),
-            'count': len(stocks),
-            'stocks': stocks
-        }
 
-        with open(cache_file, 'w') as f:
-            json.dump(cache_data, f, indent=2)
-
-        print(f"Cached {len(stocks)} stocks to {cache_file}")
-        return stocks
+        if max_age_hours is None:
+            stale = symbols
+        else:
+            stale = store.stale_symbols(symbols, max_age=max_age_hours * 3600)
+
+        if stale:
+            print(f"Fetching and caching {len(stale)}/{len(symbols)} major stocks...")
+            stocks = self.localize_logos(self.get_multiple_stocks(stale))
+            positions = {symbol: i for i, symbol in enumerate(symbols)}
+            store.upsert_many(stocks, positions=positions)
+            print(f"Cached {len(stocks)} stocks to {store.path}")
+
+        snapshot = store.snapshot()
+        return tuple(snapshot.by_symbol[symbol] for symbol in symbols if symbol in snapshot.by_symbol)
+
+    def get_snapshot(self, filename='stocks_cache.sqlite3'):
+        """Process-local, already-parsed snapshot of the stock cache"""
+        return self._get_store(filename).snapshot()
+
+    def load_cached_stocks(self, filename='stocks_cache.sqlite3', max_age_hours=24, symbols=None):
+        """
+        Load cached stocks if fresh enough
+
+        Served from the memoized snapshot, so repeated calls cost a stat() of
+        the cache file and no parsing until a refresh actually writes to it.
+
+        Args:
+            filename: Cache file name inside app/cache
+            max_age_hours: Any symbol older than this counts as a cache miss
+            symbols: Load only these symbols (default: everything cached)
+
+        Returns:
+            Tuple of read-only StockRecords, or None if anything requested is
+            missing or stale
+        """
+        snapshot = self.get_snapshot(filename)
+        oldest = snapshot.oldest_update(symbols)
+
+        if oldest is None or time.time() - oldest > max_age_hours * 3600:
+            return None
 
-    def load_cached_stocks(self, filename='stocks_cache.json', max_age_hours=24):
-        """Load cached stocks if fresh enough"""
-        cache_file = self._get_cache_path(filename)
+        if symbols is None:
+            return snapshot.stocks
+        return tuple(snapshot.by_symbol[symbol] for symbol in symbols)
 
-        try:
-            with open(cache_file, 'r') as f:
-                cache_data = json.load(f)
+    def get_cached_major_stocks(self, limit=50, max_age_hours=24):
+        """
+        Request-path read: the last good snapshot plus a staleness flag
 
-            cache_time = datetime.fromisoformat(cache_data['timestamp'])
-            age = datetime.now() - cache_time
+        Never calls Finnhub. Keeping the cache warm is the job of the background
+        refresher (see app/utils/stock_refresher.py).
 
-            if age.total_seconds() / 3600 < max_age_hours:
-                age_mins = age.total_seconds() / 60
-                print(f"Using cached data ({age_mins:.1f} minutes old, {cache_data['count']} stocks)")
-                return cache_data['stocks']
-            else:
-                print(f"Cache expired ({age.total_seconds() / 3600:.1f} hours old)")
-                return None
+        Returns:
+            (stocks, is_stale) where stocks may be empty on a cold cache
+        """
+        symbols = self.get_major_stocks_list(limit=limit)
+        snapshot = self.get_snapshot()
+        stocks = tuple(snapshot.by_symbol[symbol] for symbol in symbols if symbol in snapshot.by_symbol)
 
-        except (FileNotFoundError, json.JSONDecodeError, KeyError) as e:
-            print(f"No valid cache found: {e}")
-            return None
+        oldest = snapshot.oldest_update(symbols)
+        is_stale = oldest is None or time.time() - oldest > max_age_hours * 3600
+        return stocks, is_stale
 
     def get_all_major_stocks(self, limit=50, use_cache=True, cache_max_age_hours=24):
         """Main method: Get all major stocks with caching"""
+        symbols = self.get_major_stocks_list(limit=limit)
         if use_cache:
-            cached = self.load_cached_stocks(max_age_hours=cache_max_age_hours)
+            cached = self.load_cached_stocks(max_age_hours=cache_max_age_hours, symbols=symbols)
             if cached:
                 return cached
 
-        return self.cache_major_stocks(limit=limit)
+        # Only the stale symbols are refetched when the cache is in use
+        return self.cache_major_stocks(limit=limit, max_age_hours=cache_max_age_hours if use_cache else None)
 
-    def categorize_stocks(self, stocks):
-        """Categorize stocks into trending, gainers, losers"""
+    def categorize_stocks(self, stocks, k=10, categories=DEFAULT_CATEGORIES):
+        """Categorize stocks into trending, gainers, losers (top k of each, one pass)"""
         if not stocks:
-            return {'trending': [], 'gainers': [], 'losers': []}
+            return {name: [] for name in categories}
 
-        # Filter out stocks with missing data
-        valid_stocks = [s for s in stocks if s.get('percent_change') is not None]
+        return rank_stocks(stocks, k=k, categories=categories)
 
-        return {
-            'trending': sorted(stocks, key=lambda x: x.get('marketCap', 0) or 0, reverse=True)[:10],
-            'gainers': sorted(valid_stocks, key=lambda x: x.get('percent_change', -999), reverse=True)[:10],
-            'losers': sorted(valid_stocks, key=lambda x: x.get('percent_change', 999))[:10]
-        }
+    def get_cached_categories(self, limit=50, k=10, categories=DEFAULT_CATEGORIES):
+        """Categories for the cached universe, computed once per snapshot version"""
+        snapshot = self.get_snapshot()
+        symbols = self.get_major_stocks_list(limit=limit)
+        stocks = [snapshot.by_symbol[symbol] for symbol in symbols if symbol in snapshot.by_symbol]
+        return self._rankings.get(snapshot.version, stocks, k=k, categories=categories, scope=limit)
+
+    def search_stocks(self, query, limit=10):
+        """
+        Typeahead search: cached stocks first (they have prices), then any other
+        matching symbol from the universe
+
+        Never calls Finnhub; the cached-stock index catches up with the snapshot
+        incrementally on the first search after a refresh.
+        """
+        self._search.refresh(self.get_snapshot())
+        results = [
+            {field: stock[field] for field in SEARCH_RESULT_FIELDS}
+            for stock in self._search.search(query, limit=limit)
+        ]
+
+        if len(results) < limit:
+            found = {result['symbol'] for result in results}
+            for row in self.universe.search(query, limit=limit):
+                if row['symbol'] not in found and len(results) < limit:
+                    result = dict.fromkeys(SEARCH_RESULT_FIELDS)
+                    result.update(symbol=row['symbol'], name=row['description'], exchange=row['exchange'])
+                    results.append(result)
+        return results
 
 
 # ==================== MODULE-LEVEL INITIALIZATION ====================
 # Initialize API instance (singleton pattern)
-api = FinnhubStockAPI(api_key=os.environ.get('FINNHUB_API_KEY'))
+# With REDIS_URL set, all gunicorn workers share one Finnhub budget
+api = FinnhubStockAPI(
+    api_key=os.environ.get('FINNHUB_API_KEY'),
+    rate_limiter=create_rate_limiter(
+        rate=int(os.environ.get('FINNHUB_REQUESTS_PER_MINUTE', 55)) / 60,
+        capacity=int(os.environ.get('FINNHUB_BURST', 5)),
+        redis_url=os.environ.get('REDIS_URL'),
+        key='ratelimit:finnhub'
+    ),
+    max_workers=int(os.environ.get('FINNHUB_MAX_WORKERS', 8)),
+    pool_size=int(os.environ.get('FINNHUB_POOL_SIZE', 0)) or None,
+    connect_timeout=float(os.environ.get('FINNHUB_CONNECT_TIMEOUT', 3.05)),
+    read_timeout=float(os.environ.get('FINNHUB_READ_TIMEOUT', 10))
+)
 
 # DO NOT fetch stocks at module import time!
 # This will run every time the module is imported, causing issues
@@ -0,0 +1,97 @@
+import asyncio
+import httpx
+
+
+class AsyncFinnhubClient:
+    """
+    Optional asyncio client for batched Finnhub fetches
+
+    Wraps a FinnhubStockAPI so it shares the same rate limiter and quote /
+    profile caches, but sends requests over one pooled httpx.AsyncClient.
+    A whole batch then runs on one event loop with reused keep-alive
+    connections instead of one thread per in-flight request.
+
+    Usage:
+        async with AsyncFinnhubClient(api) as client:
+            stocks = await client.get_multiple_stocks(symbols)
+    """
+
+    def __init__(self, stock_api, max_connections=None):
+        self.api = stock_api
+        max_connections = max_connections or stock_api.pool_size
+        connect_timeout, read_timeout = stock_api.timeout
+        self.client = httpx.AsyncClient(
+            base_url=stock_api.base_url,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            headers={"Accept-Encoding": "gzip, deflate"}
+        )
+        self._concurrency = asyncio.Semaphore(max_connections)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def _rate_limit(self):
+        # try_acquire never blocks, so the event loop keeps running while we wait
+        while True:
+            wait = self.api.rate_limiter.try_acquire()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def _get(self, endpoint, params=None, retries=3):
+        """Async counterpart of FinnhubStockAPI._get"""
+        params = dict(params or {})
+        params["token"] = self.api.api_key
+
+        for attempt in range(retries):
+            try:
+                async with self._concurrency:
+                    await self._rate_limit()
+                    response = await self.client.get(endpoint, params=params)
+
+                if response.status_code == 429:  # Rate limited
+                    wait_time = float(response.headers.get("Retry-After", 60))
+                    print(f"Rate limited. Pausing all Finnhub calls for {wait_time}s...")
+                    self.api.rate_limiter.penalize(wait_time)
+                    continue
+
+                response.raise_for_status()
+                return response.json()
+
+            except httpx.HTTPError as e:
+                if attempt == retries - 1:  # Last retry
+                    print(f"API Error after {retries} attempts: {e}")
+                    return None
+                await asyncio.sleep(2 ** attempt)  # Exponential backoff
+
+        return None
+
+    async def _cached_get(self, cache, endpoint, symbol, max_age=None):
+        value = cache.get(symbol, max_age=max_age)
+        if value is None:
+            value = await self._get(endpoint, {"symbol": symbol})
+            if value:
+                cache.set(symbol, value)
+        return value
+
+    async def get_stock_details(self, symbol, max_quote_age=None, max_profile_age=None):
+        """Quote and profile for one symbol, fetched concurrently"""
+        quote, profile = await asyncio.gather(
+            self._cached_get(self.api.quote_cache, "/quote", symbol, max_quote_age),
+            self._cached_get(self.api.profile_cache, "/stock/profile2", symbol, max_profile_age)
+        )
+        return self.api._build_stock_details(symbol, quote, profile)
+
+    async def get_multiple_stocks(self, symbols, max_quote_age=None, max_profile_age=None):
+        """Details for many symbols, in the caller's order (failed symbols are skipped)"""
+        results = await asyncio.gather(*(
+            self.get_stock_details(symbol, max_quote_age, max_profile_age) for symbol in symbols
+        ))
+        return [result for result in results if result]
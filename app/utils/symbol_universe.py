@@ -0,0 +1,278 @@
+import csv
+import click
+import heapq
+from itertools import islice
+import threading
+from app.utils.prefix_index import PrefixIndex
+from app.utils.sqlite_store import SQLiteStore
+
+# Most popular US stocks, in display order, with the domain used for the
+# Clearbit logo fallback. Seeds an empty universe so the app works offline.
+SEED_SYMBOLS = (
+    ("AAPL", "Apple Inc", "apple.com"),
+    ("MSFT", "Microsoft Corp", "microsoft.com"),
+    ("GOOGL", "Alphabet Inc Class A", "google.com"),
+    ("AMZN", "Amazon.com Inc", "amazon.com"),
+    ("NVDA", "NVIDIA Corp", "nvidia.com"),
+    ("META", "Meta Platforms Inc", "meta.com"),
+    ("TSLA", "Tesla Inc", "tesla.com"),
+    ("BRK.B", "Berkshire Hathaway Inc Class B", "berkshirehathaway.com"),
+    ("JPM", "JPMorgan Chase & Co", "jpmorganchase.com"),
+    ("V", "Visa Inc", "visa.com"),
+    ("WMT", "Walmart Inc", "walmart.com"),
+    ("MA", "Mastercard Inc", "mastercard.com"),
+    ("UNH", "UnitedHealth Group Inc", "unitedhealthgroup.com"),
+    ("JNJ", "Johnson & Johnson", "jnj.com"),
+    ("XOM", "Exxon Mobil Corp", "exxonmobil.com"),
+    ("PG", "Procter & Gamble Co", "pg.com"),
+    ("HD", "Home Depot Inc", "homedepot.com"),
+    ("CVX", "Chevron Corp", "chevron.com"),
+    ("ABBV", "AbbVie Inc", "abbvie.com"),
+    ("LLY", "Eli Lilly and Co", "lilly.com"),
+    ("MRK", "Merck & Co Inc", "merck.com"),
+    ("KO", "Coca-Cola Co", "coca-cola.com"),
+    ("PEP", "PepsiCo Inc", "pepsi.com"),
+    ("COST", "Costco Wholesale Corp", "costco.com"),
+    ("AVGO", "Broadcom Inc", "broadcom.com"),
+    ("TMO", "Thermo Fisher Scientific Inc", "thermofisher.com"),
+    ("ADBE", "Adobe Inc", "adobe.com"),
+    ("ACN", "Accenture PLC", "accenture.com"),
+    ("CSCO", "Cisco Systems Inc", "cisco.com"),
+    ("DIS", "Walt Disney Co", "disney.com"),
+    ("NKE", "Nike Inc", "nike.com"),
+    ("NFLX", "Netflix Inc", "netflix.com"),
+    ("CRM", "Salesforce Inc", "salesforce.com"),
+    ("INTC", "Intel Corp", "intel.com"),
+    ("AMD", "Advanced Micro Devices Inc", "amd.com"),
+    ("QCOM", "Qualcomm Inc", "qualcomm.com"),
+    ("TXN", "Texas Instruments Inc", "ti.com"),
+    ("ORCL", "Oracle Corp", "oracle.com"),
+    ("IBM", "International Business Machines Corp", "ibm.com"),
+    ("PYPL", "PayPal Holdings Inc", "paypal.com"),
+    ("BA", "Boeing Co", "boeing.com"),
+    ("GE", "General Electric Co", "ge.com"),
+    ("CAT", "Caterpillar Inc", "caterpillar.com"),
+    ("UPS", "United Parcel Service Inc", "ups.com"),
+    ("GS", "Goldman Sachs Group Inc", "goldmansachs.com"),
+    ("MS", "Morgan Stanley", "morganstanley.com"),
+    ("AXP", "American Express Co", "americanexpress.com"),
+    ("BLK", "BlackRock Inc", "blackrock.com"),
+    ("SBUX", "Starbucks Corp", "starbucks.com"),
+    ("MCD", "McDonald's Corp", "mcdonalds.com"),
+    ("GOOG", "Alphabet Inc Class C", "google.com"),
+)
+
+SYMBOL_COLUMNS = ("symbol", "description", "display_symbol", "type", "exchange", "currency", "mic", "figi", "domain")
+
+# Search ranking: lower is better
+TICKER, NAME = 0, 1
+
+
+class SymbolUniverseStore(SQLiteStore):
+    """
+    On-disk list of every tradable symbol we know about
+
+    `rank` orders the universe by popularity (seeded symbols first); symbols
+    loaded from an exchange list have no rank and sort after, by ticker.
+    Reloading a list never clears a rank or logo domain set earlier.
+    """
+
+    def _create_schema(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS symbols (
+                    symbol         TEXT PRIMARY KEY,
+                    description    TEXT,
+                    display_symbol TEXT,
+                    type           TEXT,
+                    exchange       TEXT,
+                    currency       TEXT,
+                    mic            TEXT,
+                    figi           TEXT,
+                    domain         TEXT,
+                    rank           INTEGER
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_symbols_rank ON symbols (rank, symbol)")
+
+    def upsert_many(self, rows):
+        """
+        Insert or update symbols in one transaction
+
+        Args:
+            rows: Dicts with any of SYMBOL_COLUMNS plus optional 'rank'
+                ('symbol' required); missing values keep what is stored
+        """
+        columns = SYMBOL_COLUMNS + ("rank",)
+        updates = ", ".join(f"{column} = COALESCE(excluded.{column}, {column})" for column in columns[1:])
+        params = [tuple(row.get(column) for column in columns) for row in rows if row.get("symbol")]
+
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                f"INSERT INTO symbols ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT(symbol) DO UPDATE SET {updates}",
+                params
+            )
+        return len(params)
+
+    def all(self):
+        """Every symbol as a dict, most popular first"""
+        rows = self._connect().execute(
+            f"SELECT {', '.join(SYMBOL_COLUMNS)}, rank FROM symbols ORDER BY rank IS NULL, rank, symbol"
+        )
+        return [dict(zip(SYMBOL_COLUMNS + ("rank",), row)) for row in rows]
+
+    def count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM symbols").fetchone()[0]
+
+
+class SymbolUniverse:
+    """
+    The set of symbols the app tracks, with ticker / company-name autocomplete
+
+    Backed by a SymbolUniverseStore, loaded from Finnhub's /stock/symbol or a
+    CSV stand-in, and seeded with SEED_SYMBOLS when empty. Reads are served
+    from an in-memory copy plus a PrefixIndex, rebuilt when the store changes.
+
+    Usage:
+        universe.load_finnhub(api, exchange='US')
+        universe.symbols(limit=500)   # what the refresher tracks
+        universe.search('app')        # [{'symbol': 'AAPL', ...}, ...]
+    """
+
+    def __init__(self, store, types=("Common Stock",)):
+        self.store = store
+        self.types = types  # symbol types tracked by default (ETFs, warrants... are excluded)
+        self._loaded = None  # (version, rows, by_symbol, index)
+        self._lock = threading.Lock()
+
+    # ============= Loading =============
+
+    def seed(self):
+        """Load SEED_SYMBOLS, keeping their order as the popularity rank"""
+        return self.store.upsert_many(
+            {"symbol": symbol, "description": name, "display_symbol": symbol,
+             "type": "Common Stock", "domain": domain, "rank": rank}
+            for rank, (symbol, name, domain) in enumerate(SEED_SYMBOLS)
+        )
+
+    def load_finnhub(self, stock_api, exchange="US"):
+        """Load an exchange's full symbol list from Finnhub /stock/symbol"""
+        rows = stock_api._get("/stock/symbol", {"exchange": exchange})
+        if not rows:
+            return 0
+        return self.store.upsert_many(
+            {
+                "symbol": row.get("symbol"),
+                "description": row.get("description"),
+                "display_symbol": row.get("displaySymbol"),
+                "type": row.get("type"),
+                "exchange": exchange,
+                "currency": row.get("currency"),
+                "mic": row.get("mic"),
+                "figi": row.get("figi")
+            }
+            for row in rows
+        )
+
+    def load_csv(self, path):
+        """
+        Load symbols from a CSV with a header row
+
+        Recognised columns are SYMBOL_COLUMNS plus 'rank'; only 'symbol' is required.
+        """
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = []
+            for row in csv.DictReader(f):
+                row = {key.strip().lower(): (value.strip() or None) for key, value in row.items() if key}
+                if row.get("rank") is not None:
+                    row["rank"] = int(row["rank"])
+                rows.append(row)
+        return self.store.upsert_many(rows)
+
+    def _load(self):
+        """Current (rows, by_symbol, index), rebuilt only when the store changed"""
+        version = self.store.file_signature()
+        loaded = self._loaded
+        if loaded is not None and loaded[0] == version:
+            return loaded[1:]
+
+        with self._lock:
+            if self._loaded is None or self._loaded[0] != self.store.file_signature():
+                if not self.store.count():
+                    self.seed()
+                version = self.store.file_signature()
+                rows = self.store.all()
+                by_symbol = {row["symbol"]: row for row in rows}
+                index = PrefixIndex()
+                index.add_many(
+                    (row["symbol"], ((TICKER, row["symbol"]), (NAME, row["description"])))
+                    for row in rows
+                )
+                self._loaded = (version, rows, by_symbol, index)
+            return self._loaded[1:]
+
+    # ============= Reads =============
+
+    def symbols(self, limit=None, types=None):
+        """Tracked tickers, most popular first"""
+        types = types or self.types
+        rows, _, _ = self._load()
+        selected = (
+            row["symbol"] for row in rows
+            if row["rank"] is not None or not types or row["type"] in types
+        )
+        return list(islice(selected, limit))
+
+    def get(self, symbol):
+        _, by_symbol, _ = self._load()
+        return by_symbol.get(symbol)
+
+    def __len__(self):
+        return len(self._load()[0])
+
+    def logo_domain(self, symbol):
+        row = self.get(symbol)
+        return row["domain"] if row and row["domain"] else f"{symbol.lower().split('.')[0]}.com"
+
+    def search(self, query, limit=10):
+        """
+        Ticker / company-name autocomplete
+
+        Ranking: exact ticker, then ticker prefix, then company-name word
+        prefix; ties go to the more popular symbol, then alphabetical.
+        """
+        query = (query or "").strip().lower()
+        if not query:
+            return []
+        _, by_symbol, index = self._load()
+
+        best = {}  # symbol -> 0 exact ticker, 1 ticker prefix, 2 name prefix
+        for term, field, symbol in index.matches(query):
+            score = 0 if field == TICKER and term == query else 1 + field
+            if score < best.get(symbol, 3):
+                best[symbol] = score
+
+        def sort_key(item):
+            symbol, score = item
+            rank = by_symbol[symbol]["rank"]
+            return score, rank is None, rank or 0, len(symbol), symbol
+
+        return [by_symbol[symbol] for symbol, _ in heapq.nsmallest(limit, best.items(), key=sort_key)]
+
+
+@click.command("load-symbols")
+@click.option("--exchange", default="US", show_default=True, help="Finnhub exchange code.")
+@click.option("--csv", "csv_path", type=click.Path(exists=True, dir_okay=False),
+              help="Load from a local CSV instead of Finnhub.")
+def load_symbols_command(exchange, csv_path):
+    """Load an exchange symbol list into the symbol universe."""
+    from app.utils.stocks_api import api
+
+    if csv_path:
+        count = api.universe.load_csv(csv_path)
+    else:
+        count = api.universe.load_finnhub(api, exchange=exchange)
+    click.echo(f"Loaded {count} symbols ({len(api.universe)} in universe)")
@@ -0,0 +1,75 @@
+"""
+Micro-benchmark: per-cell Jinja filters vs display strings pre-rendered per snapshot
+
+Renders the same stock table both ways and prints the time per render.
+
+    python benchmarks/bench_formatting.py [--rows 5000] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Importing the app package builds the Flask app; give it a throwaway database
+os.environ.setdefault("DATABASE_URI", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from jinja2 import Environment  # noqa: E402
+from app.utils.formatting import format_currency, format_number  # noqa: E402
+from app.utils.stock_records import StockRecord  # noqa: E402
+
+PER_CELL = """{% for stock in stocks %}<tr><td>{{ stock.symbol }}</td>
+<td>{{ stock.current_price | currency }}</td><td>${{ stock.marketCap | compact }}</td>
+<td class="{{ 'positive' if stock.change >= 0 else 'negative' }}">{{ '%+.2f' | format(stock.percent_change) }}%</td></tr>
+{% endfor %}"""
+
+PRE_RENDERED = """{% for stock in stocks %}<tr><td>{{ stock.symbol }}</td>
+<td>{{ stock.display.price }}</td><td>${{ stock.display.market_cap }}</td>
+<td class="{{ stock.display.change_class }}">{{ stock.display.percent_change }}</td></tr>
+{% endfor %}"""
+
+
+def make_stocks(rows):
+    random.seed(42)
+    return [
+        StockRecord(
+            symbol=f"S{i:05d}",
+            current_price=round(random.uniform(1, 2000), 2),
+            change=round(random.uniform(-20, 20), 2),
+            percent_change=round(random.uniform(-10, 10), 2),
+            marketCap=random.uniform(10, 3_000_000)
+        )
+        for i in range(rows)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    env = Environment()
+    env.filters["compact"] = format_number
+    env.filters["currency"] = format_currency
+    per_cell, pre_rendered = env.from_string(PER_CELL), env.from_string(PRE_RENDERED)
+
+    stocks = make_stocks(args.rows)
+    # What a snapshot load does once (see StockSnapshot)
+    precompute = timeit.timeit(lambda: [stock.display for stock in make_stocks(args.rows)], number=1) \
+        - timeit.timeit(lambda: make_stocks(args.rows), number=1)
+    for stock in stocks:
+        stock.display
+
+    assert per_cell.render(stocks=stocks) == pre_rendered.render(stocks=stocks)
+
+    for name, template in (("per-cell filters", per_cell), ("pre-rendered", pre_rendered)):
+        seconds = min(timeit.repeat(lambda: template.render(stocks=stocks), number=1, repeat=args.repeat))
+        print(f"{name:>17}: {seconds * 1000:8.2f} ms per {args.rows}-row render")
+    print(f"{'precompute':>17}: {precompute * 1000:8.2f} ms once per snapshot")
+
+
+if __name__ == "__main__":
+    main()
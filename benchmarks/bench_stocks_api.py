@@ -0,0 +1,255 @@
+"""
+Benchmark suite for the stocks_api market-data path
+
+Runs FinnhubStockAPI against a local Finnhub stub (see finnhub_stub.py) with
+a throwaway cache directory, for several universe sizes and concurrency
+levels, and reports throughput, p50/p99 latency and peak traced memory per
+scenario. Save a run with --save and check a later one against it with
+--compare to catch regressions before deploy.
+
+    python benchmarks/bench_stocks_api.py
+    python benchmarks/bench_stocks_api.py --sizes 50 500 --concurrency 1 16 --latency 0.02
+    python benchmarks/bench_stocks_api.py --save baseline.json
+    python benchmarks/bench_stocks_api.py --compare baseline.json --threshold 1.25
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Importing the app package builds the Flask app; give it a throwaway database
+os.environ.setdefault("DATABASE_URI", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from requests.adapters import HTTPAdapter  # noqa: E402
+from app.utils.rate_limiter import LocalTokenBucket  # noqa: E402
+from app.utils.stocks_api import FinnhubStockAPI  # noqa: E402
+from benchmarks.finnhub_stub import FinnhubStub  # noqa: E402
+
+
+class BenchStockAPI(FinnhubStockAPI):
+    """FinnhubStockAPI pointed at the stub, with its caches in a temp directory"""
+
+    def __init__(self, stub, cache_dir, max_workers=8):
+        super().__init__(
+            api_key="benchmark",
+            rate_limiter=LocalTokenBucket(rate=1e9, capacity=1e9),  # measure our code, not the quota
+            max_workers=max_workers
+        )
+        self.cache_dir = Path(cache_dir)
+        self.base_url = stub.base_url
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=self.pool_size))
+
+    def _get_cache_path(self, filename='stocks_cache.sqlite3'):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        return self.cache_dir / filename
+
+
+def request_summary(requests):
+    """One line of stub request counts per endpoint, with per-symbol logo paths folded together"""
+    per_endpoint = Counter()
+    for path, count in requests.items():
+        per_endpoint["/logo/*" if path.startswith("/logo/") else path] += count
+    breakdown = ", ".join(f"{path}={count}" for path, count in per_endpoint.most_common())
+    return f"{sum(per_endpoint.values())} total ({breakdown})"
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(op, calls, concurrency):
+    """
+    Call op(i) `calls` times spread over `concurrency` threads
+
+    Returns:
+        (wall seconds, sorted per-call latencies in seconds)
+    """
+    latencies = []
+    lock = threading.Lock()
+    counter = iter(range(calls))
+
+    def worker():
+        local = []
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            started = time.perf_counter()
+            op(i)
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, sorted(latencies)
+
+
+def peak_memory(op):
+    """Peak traced allocation (bytes) of one call"""
+    tracemalloc.start()
+    try:
+        op(0)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+class Suite:
+    def __init__(self, args):
+        self.args = args
+        self.results = []
+        self.out = sys.stdout  # FinnhubStockAPI progress output is silenced while running
+
+    def record(self, size, name, concurrency, calls, wall, latencies, peak):
+        result = {
+            "size": size, "scenario": name, "concurrency": concurrency, "calls": calls,
+            "throughput": calls / wall if wall else 0.0,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "peak_kb": peak / 1024
+        }
+        self.results.append(result)
+        print(
+            f"{size:>6} {name:<26} {concurrency:>4} {calls:>6} "
+            f"{result['throughput']:>11.1f} {result['p50_ms']:>10.3f} {result['p99_ms']:>10.3f} "
+            f"{result['peak_kb']:>10.0f}",
+            file=self.out, flush=True
+        )
+
+    def scenario(self, size, name, make_op, calls, concurrency_levels):
+        """Time make_op() at each concurrency level, then trace one call's memory"""
+        op = make_op()
+        for concurrency in concurrency_levels:
+            wall, latencies = run(op, calls, concurrency)
+            self.record(size, name, concurrency, calls, wall, latencies, peak_memory(op))
+
+    def cold(self, size, name, stub, fn, repeat):
+        """
+        Time fn(api) on a brand-new API and cache directory each repetition,
+        then trace the memory of one more (tracing slows the timed runs down)
+        """
+        def fresh(op):
+            with tempfile.TemporaryDirectory() as cache_dir:
+                api = self.new_api(stub, cache_dir)
+                return op(lambda i: fn(api))
+
+        latencies = []
+        for _ in range(repeat):
+            latencies.extend(fresh(lambda op: run(op, 1, 1)[1]))
+        peak = fresh(peak_memory)
+        self.record(size, name, 1, repeat, sum(latencies), sorted(latencies), peak)
+
+    def new_api(self, stub, cache_dir):
+        api = BenchStockAPI(stub, cache_dir, max_workers=self.args.workers)
+        if len(api.universe) < max(self.args.sizes):
+            api.universe.load_finnhub(api)
+        return api
+
+    def run_size(self, stub, size):
+        args = self.args
+        calls = args.calls
+        levels = args.concurrency
+        candle_symbols = min(size, 200)
+
+        # Cold: empty cache, everything fetched from the stub (incl. logos)
+        self.cold(size, "cache_major_stocks[cold]", stub,
+                  lambda api: api.cache_major_stocks(limit=size), repeat=1 if size >= 5000 else 3)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            api = self.new_api(stub, cache_dir)
+            api.cache_major_stocks(limit=size)
+            symbols = api.get_major_stocks_list(limit=size)
+            stocks = api.load_cached_stocks(symbols=symbols)
+
+            # Warm: served from the memoized snapshot / caches
+            self.scenario(size, "get_all_major_stocks", lambda: lambda i: api.get_all_major_stocks(limit=size),
+                          calls, levels)
+            self.scenario(size, "load_cached_stocks", lambda: lambda i: api.load_cached_stocks(symbols=symbols),
+                          calls, levels)
+            self.scenario(size, "categorize_stocks", lambda: lambda i: api.categorize_stocks(stocks),
+                          max(calls // 10, 10), levels)
+            self.scenario(size, "get_cached_categories", lambda: lambda i: api.get_cached_categories(limit=size),
+                          calls, levels)
+            queries = ["a", "sy", "syn00", "tech", "apple", "bank", "m", "micro"]
+            self.scenario(size, "search_stocks", lambda: lambda i: api.search_stocks(queries[i % len(queries)]),
+                          calls, levels)
+
+            # Candles: first call per symbol fetches, later calls slice the mmap store
+            self.scenario(size, "get_candles[cold]",
+                          lambda: lambda i: api.get_candles(symbols[i % candle_symbols], days_back=90),
+                          candle_symbols, [1])
+            self.scenario(size, "get_candles[warm]",
+                          lambda: lambda i: api.get_candles(symbols[i % candle_symbols], days_back=90),
+                          calls, levels)
+
+    def main(self):
+        args = self.args
+        print(f"{'size':>6} {'scenario':<26} {'conc':>4} {'calls':>6} "
+              f"{'ops/s':>11} {'p50 ms':>10} {'p99 ms':>10} {'peak KB':>10}")
+        with FinnhubStub(fixtures=args.fixtures, latency=args.latency, universe_size=max(args.sizes)) as stub:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                for size in args.sizes:
+                    self.run_size(stub, size)
+            print(f"\nStub requests: {request_summary(stub.requests)}")
+
+        if args.save:
+            Path(args.save).write_text(json.dumps(self.results, indent=2))
+            print(f"Saved {len(self.results)} results to {args.save}")
+        if args.compare:
+            return compare(self.results, json.loads(Path(args.compare).read_text()), args.threshold)
+        return 0
+
+
+def compare(results, baseline, threshold):
+    """Flag scenarios whose p50 latency regressed by more than `threshold`x"""
+    key = lambda result: (result["size"], result["scenario"], result["concurrency"])
+    previous = {key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(key(result))
+        if before and before["p50_ms"] > 0 and result["p50_ms"] / before["p50_ms"] > threshold:
+            regressions.append((key(result), before["p50_ms"], result["p50_ms"]))
+
+    if not regressions:
+        print(f"\nNo p50 regressions above {threshold}x")
+        return 0
+    print(f"\n{len(regressions)} regression(s) above {threshold}x:")
+    for (size, scenario, concurrency), before, after in regressions:
+        print(f"  {scenario} (size={size}, concurrency={concurrency}): {before:.3f} ms -> {after:.3f} ms")
+    return 1
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the stocks_api market-data path")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000], help="Universe sizes")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Thread counts")
+    parser.add_argument("--calls", type=int, default=500, help="Calls per warm scenario")
+    parser.add_argument("--workers", type=int, default=16, help="FinnhubStockAPI fetch pool size")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated stub round trip in seconds")
+    parser.add_argument("--fixtures", help="Directory of recorded Finnhub responses")
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON to compare p50 latencies against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Allowed p50 slowdown factor")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(Suite(parse_args()).main())
@@ -0,0 +1,258 @@
+"""
+Local stand-in for the Finnhub REST API, for benchmarks
+
+Serves recorded responses from a fixtures directory when present and
+deterministic synthetic ones otherwise, so benchmark runs are repeatable and
+never touch the network or spend API quota.
+
+Fixture layout (all optional, JSON files as returned by Finnhub):
+
+    <fixtures>/quote/<SYMBOL>.json
+    <fixtures>/profile2/<SYMBOL>.json
+    <fixtures>/candle/<SYMBOL>.json
+    <fixtures>/company-news/<SYMBOL>.json
+    <fixtures>/symbol/<EXCHANGE>.json
+
+Record a set from the real API with:
+
+    FINNHUB_API_KEY=... python benchmarks/finnhub_stub.py record benchmarks/fixtures AAPL MSFT ...
+"""
+import hashlib
+import json
+import os
+import random
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+# Finnhub path -> fixture sub-directory
+ENDPOINTS = {
+    "/api/v1/quote": "quote",
+    "/api/v1/stock/profile2": "profile2",
+    "/api/v1/stock/candle": "candle",
+    "/api/v1/company-news": "company-news",
+    "/api/v1/stock/symbol": "symbol",
+}
+
+INDUSTRIES = ("Technology", "Banking", "Retail", "Pharmaceuticals", "Semiconductors", "Media", "Energy")
+
+
+def _rng(*parts):
+    seed = hashlib.md5("|".join(map(str, parts)).encode("utf-8")).hexdigest()
+    return random.Random(int(seed[:16], 16))
+
+
+def _png(seed):
+    """A small valid PNG, unique per seed"""
+    rng = _rng("logo", seed)
+    color = bytes(rng.randrange(256) for _ in range(3))
+    raw = b"".join(b"\x00" + color * 32 for _ in range(32))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", 32, 32, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b""))
+
+
+class FinnhubStub:
+    """
+    Threaded HTTP server answering the Finnhub endpoints the app uses
+
+    Args:
+        fixtures: Directory of recorded responses (see module docstring)
+        latency: Seconds to sleep per request, to mimic the network round trip
+        universe_size: Number of symbols /stock/symbol returns when not recorded
+
+    Usage:
+        with FinnhubStub(latency=0.02) as stub:
+            api.base_url = stub.base_url
+    """
+
+    def __init__(self, fixtures=None, latency=0.0, universe_size=5000):
+        self.fixtures = Path(fixtures) if fixtures else None
+        self.latency = latency
+        self.universe_size = universe_size
+        self.requests = Counter()
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    @property
+    def base_url(self):
+        return f"{self.url}/api/v1"
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="finnhub-stub", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # ============= Responses =============
+
+    def _handle(self, handler):
+        parsed = urlparse(handler.path)
+        params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        with self._lock:
+            self.requests[parsed.path] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        if parsed.path.startswith("/logo/"):
+            body, content_type = _png(parsed.path), "image/png"
+        elif parsed.path in ENDPOINTS:
+            kind = ENDPOINTS[parsed.path]
+            key = params.get("exchange") if kind == "symbol" else params.get("symbol", "")
+            data = self._recorded(kind, key)
+            if data is None:
+                data = getattr(self, "_" + kind.replace("-", "_"))(key, params)
+            body, content_type = json.dumps(data).encode("utf-8"), "application/json"
+        else:
+            handler.send_response(404)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _recorded(self, kind, key):
+        if self.fixtures is None or not key:
+            return None
+        path = self.fixtures / kind / f"{key}.json"
+        if not path.is_file():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def _quote(self, symbol, params):
+        rng = _rng("quote", symbol)
+        previous_close = round(rng.uniform(5, 900), 2)
+        price = round(previous_close * rng.uniform(0.9, 1.1), 2)
+        return {
+            "c": price, "d": round(price - previous_close, 2),
+            "dp": round((price - previous_close) / previous_close * 100, 4),
+            "h": round(max(price, previous_close) * 1.01, 2), "l": round(min(price, previous_close) * 0.99, 2),
+            "o": previous_close, "pc": previous_close, "t": int(time.time())
+        }
+
+    def _profile2(self, symbol, params):
+        rng = _rng("profile", symbol)
+        return {
+            "name": f"{symbol.title()} {rng.choice(('Holdings', 'Corp', 'Inc', 'Group'))}",
+            "ticker": symbol, "exchange": "NASDAQ NMS - GLOBAL MARKET",
+            "finnhubIndustry": rng.choice(INDUSTRIES),
+            "marketCapitalization": round(rng.lognormvariate(9, 2), 2),
+            "country": "US", "currency": "USD", "weburl": f"https://{symbol.lower()}.example.com",
+            "logo": f"{self.url}/logo/{symbol}.png"
+        }
+
+    def _candle(self, symbol, params):
+        start, end = int(params.get("from", 0)), int(params.get("to", time.time()))
+        resolution = params.get("resolution", "D")
+        step = {"D": 86400, "W": 604800, "M": 2592000}.get(resolution) or 60 * int(resolution)
+        timestamps = list(range(start - start % step + step, end + 1, step))
+        if not timestamps:
+            return {"s": "no_data"}
+        rng = _rng("candle", symbol)
+        price = rng.uniform(5, 900)
+        columns = {"t": [], "o": [], "h": [], "l": [], "c": [], "v": []}
+        for timestamp in timestamps:
+            close = price * (1 + _rng(symbol, timestamp).gauss(0, 0.02))
+            columns["t"].append(timestamp)
+            columns["o"].append(round(price, 2))
+            columns["h"].append(round(max(price, close) * 1.005, 2))
+            columns["l"].append(round(min(price, close) * 0.995, 2))
+            columns["c"].append(round(close, 2))
+            columns["v"].append(_rng("volume", symbol, timestamp).randrange(100_000, 10_000_000))
+            price = close
+        return {"s": "ok", **columns}
+
+    def _company_news(self, symbol, params):
+        rng = _rng("news", symbol, params.get("from"))
+        now = int(time.time())
+        return [
+            {
+                "headline": f"{symbol} headline {i}", "summary": "Lorem ipsum " * 20,
+                "source": rng.choice(("Reuters", "Bloomberg", "CNBC")),
+                "url": f"https://news.example.com/{symbol}/{params.get('from')}/{i}",
+                "image": "", "datetime": now - rng.randrange(7 * 86400), "category": "company"
+            }
+            for i in range(5)
+        ]
+
+    def _symbol(self, exchange, params):
+        return [
+            {
+                "symbol": f"SYN{i:05d}", "displaySymbol": f"SYN{i:05d}",
+                "description": f"SYNTHETIC COMPANY {i} INC", "type": "Common Stock",
+                "currency": "USD", "mic": "XNAS", "figi": f"BBG{i:09d}"
+            }
+            for i in range(self.universe_size)
+        ]
+
+
+def record(directory, symbols, api_key, exchange="US"):
+    """Save real Finnhub responses for `symbols` as fixtures (respecting the free-tier rate)"""
+    import requests
+
+    base = "https://finnhub.io/api/v1"
+    now = int(time.time())
+    today = time.strftime("%Y-%m-%d")
+    week_ago = time.strftime("%Y-%m-%d", time.gmtime(now - 7 * 86400))
+    jobs = [("symbol", exchange, "/stock/symbol", {"exchange": exchange})]
+    for symbol in symbols:
+        jobs += [
+            ("quote", symbol, "/quote", {"symbol": symbol}),
+            ("profile2", symbol, "/stock/profile2", {"symbol": symbol}),
+            ("candle", symbol, "/stock/candle", {"symbol": symbol, "resolution": "D", "from": now - 90 * 86400, "to": now}),
+            ("company-news", symbol, "/company-news", {"symbol": symbol, "from": week_ago, "to": today}),
+        ]
+
+    for kind, key, endpoint, params in jobs:
+        response = requests.get(base + endpoint, params={**params, "token": api_key}, timeout=10)
+        if response.ok:
+            path = Path(directory) / kind / f"{key}.json"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(response.text, encoding="utf-8")
+        print(f"{kind:<13} {key:<8} {response.status_code}")
+        time.sleep(60 / 55)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] != "record":
+        sys.exit("usage: python benchmarks/finnhub_stub.py record <directory> <SYMBOL> [<SYMBOL> ...]")
+    record(sys.argv[2], sys.argv[3:], os.environ["FINNHUB_API_KEY"])
@@ -0,0 +1,239 @@
+"""
+Local stand-in for the Finnhub trade WebSocket, for development and benchmarks
+
+Speaks the subset of Finnhub's streaming protocol QuoteFeed uses: clients send
+{"type": "subscribe"|"unsubscribe", "symbol": ...} and receive
+{"type": "trade", "data": [{"s", "p", "v", "t"}]} batches for the symbols
+they subscribed to, as a deterministic random walk per symbol. Stdlib only
+(a minimal RFC 6455 server), so it runs wherever the app does.
+
+Run the app against it with:
+
+    python benchmarks/finnhub_ws_stub.py --port 8765 --rate 20
+    FINNHUB_WEBSOCKET=true FINNHUB_WS_URL=ws://127.0.0.1:8765 flask run
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import socketserver
+import struct
+import sys
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.finnhub_stub import _rng  # noqa: E402
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_TEXT, OP_CLOSE, OP_PING, OP_PONG = 0x1, 0x8, 0x9, 0xA
+
+
+class FinnhubWebSocketStub:
+    """
+    Threaded WebSocket server emitting synthetic trades
+
+    Args:
+        port: Port to listen on (0 picks a free one)
+        rate: Trade batches sent per second to each connection
+        batch_size: Trades per batch, spread over the subscribed symbols
+
+    Usage:
+        with FinnhubWebSocketStub(rate=50) as stub:
+            feed = QuoteFeed(api_key="stub", url=stub.url)
+    """
+
+    def __init__(self, port=0, rate=10.0, batch_size=5):
+        self.port = port
+        self.rate = rate
+        self.batch_size = batch_size
+        self.messages = Counter()  # message type -> count, both directions
+        self._walks = {}  # symbol -> [rng, last price]
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        return f"ws://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        stub = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                stub._handle(self)
+
+        class Server(socketserver.ThreadingTCPServer):
+            allow_reuse_address = True
+            daemon_threads = True
+
+        self._server = Server(("127.0.0.1", self.port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="finnhub-ws-stub", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # ============= Connection =============
+
+    def _handle(self, handler):
+        if not self._handshake(handler):
+            return
+
+        connection = _Connection(handler)
+        symbols = set()
+        sender = threading.Thread(target=self._send_trades, args=(connection, symbols), daemon=True)
+        sender.start()
+
+        try:
+            while True:
+                opcode, payload = connection.read_frame()
+                if opcode == OP_CLOSE:
+                    connection.send(OP_CLOSE, payload[:2])
+                    break
+                if opcode == OP_PING:
+                    connection.send(OP_PONG, payload)
+                elif opcode == OP_TEXT:
+                    self._on_message(connection, symbols, payload)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            connection.closed.set()
+
+    def _handshake(self, handler):
+        request_line = handler.rfile.readline()
+        headers = {}
+        while True:
+            line = handler.rfile.readline().decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        key = headers.get("sec-websocket-key")
+        if not request_line.startswith(b"GET ") or not key:
+            handler.wfile.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+            return False
+
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode("ascii")).digest()).decode("ascii")
+        handler.wfile.write(
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode("ascii")
+        )
+        return True
+
+    def _on_message(self, connection, symbols, payload):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        kind, symbol = message.get("type"), message.get("symbol")
+        with self._lock:
+            self.messages[kind] += 1
+        if kind == "subscribe" and symbol:
+            symbols.add(symbol)
+        elif kind == "unsubscribe":
+            symbols.discard(symbol)
+        else:
+            connection.send_json({"type": "error", "msg": f"Unknown message: {payload[:100]!r}"})
+
+    # ============= Trades =============
+
+    def _send_trades(self, connection, symbols):
+        interval = 1 / self.rate
+        while not connection.closed.wait(interval):
+            subscribed = sorted(symbols)
+            if not subscribed:
+                continue
+            data = [self._trade(subscribed[i % len(subscribed)]) for i in range(self.batch_size)]
+            try:
+                connection.send_json({"type": "trade", "data": data})
+            except OSError:
+                break
+            with self._lock:
+                self.messages["trade"] += 1
+
+    def _trade(self, symbol):
+        with self._lock:
+            walk = self._walks.get(symbol)
+            if walk is None:
+                rng = _rng("ws", symbol)
+                walk = self._walks[symbol] = [rng, round(rng.uniform(10, 500), 2)]
+            rng, price = walk
+            price = walk[1] = max(0.01, round(price * (1 + rng.gauss(0, 0.0005)), 2))
+            volume = rng.randrange(1, 500)
+        return {"s": symbol, "p": price, "v": volume, "t": int(time.time() * 1000), "c": None}
+
+
+class _Connection:
+    """One upgraded socket: frame reads, and locked writes shared with the trade sender"""
+
+    def __init__(self, handler):
+        self.rfile = handler.rfile
+        self.wfile = handler.wfile
+        self.closed = threading.Event()
+        self._write_lock = threading.Lock()
+
+    def read_frame(self):
+        head = self._read(2)
+        opcode, length = head[0] & 0x0F, head[1] & 0x7F
+        if length == 126:
+            length = struct.unpack(">H", self._read(2))[0]
+        elif length == 127:
+            length = struct.unpack(">Q", self._read(8))[0]
+        mask = self._read(4) if head[1] & 0x80 else None
+        payload = self._read(length)
+        if mask:
+            payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+        return opcode, payload
+
+    def _read(self, size):
+        data = self.rfile.read(size)
+        if len(data) < size:
+            raise ConnectionError("client went away")
+        return data
+
+    def send(self, opcode, payload=b""):
+        # Server frames are never masked and always fit in a single frame here
+        length = len(payload)
+        if length < 126:
+            head = struct.pack(">BB", 0x80 | opcode, length)
+        elif length < 1 << 16:
+            head = struct.pack(">BBH", 0x80 | opcode, 126, length)
+        else:
+            head = struct.pack(">BBQ", 0x80 | opcode, 127, length)
+        with self._write_lock:
+            self.wfile.write(head + payload)
+
+    def send_json(self, message):
+        self.send(OP_TEXT, json.dumps(message).encode("utf-8"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Finnhub trade WebSocket stand-in")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--rate", type=float, default=10.0, help="Trade batches per second per connection")
+    parser.add_argument("--batch-size", type=int, default=5, help="Trades per batch")
+    args = parser.parse_args()
+
+    stub = FinnhubWebSocketStub(port=args.port, rate=args.rate, batch_size=args.batch_size).start()
+    print(f"Finnhub WebSocket stub on {stub.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()